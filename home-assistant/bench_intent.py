@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+意图路由基准测试
+对比旧的 any(k in text) 链式判断和编译后的意图路由器
+用法: python3 bench_intent.py [语料文件] [-n 轮数]
+"""
+
+import re
+import sys
+import time
+import argparse
+from pathlib import Path
+
+from intent_router import route
+
+CORPUS_FILE = Path(__file__).parent / "bench" / "chat_lines.txt"
+
+def legacy_route(text):
+    """旧版 parse_command 的判断逻辑（不执行动作）"""
+    if any(k in text for k in ["搜索", "查一下", "search", "查"]):
+        import re
+        query = text
+        for k in ["搜索", "查一下", "search", "查"]:
+            query = query.replace(k, "")
+        return "search", query.strip()
+    if any(k in text for k in ["讲故事", "故事", "讲个故事"]):
+        topic = None
+        for t in ["小红帽", "三只小猪", "丑小鸭", "皇帝的新装", "白雪公主", "灰姑娘"]:
+            if t in text:
+                topic = t
+                break
+        return "story", topic
+    if any(k in text for k in ["放歌", "听歌", "播放", "音乐"]):
+        song = None
+        for s in ["童年", "简单爱", "夜空中最亮的星", "平凡之路"]:
+            if s in text:
+                song = s
+                break
+        return "music", song
+    if any(k in text for k in ["天气", "气温", "温度"]):
+        import re
+        city_match = re.search(r'(北京|上海|广州|深圳|杭州|南京|成都|武汉|西安|重庆)', text)
+        return "weather", city_match.group(1) if city_match else "上海"
+    if any(k in text for k in ["提醒", "叫我", "定个闹钟"]):
+        import re
+        time_match = re.search(r'(\d+)[点时]', text)
+        return "reminder", time_match.group(1) if time_match else None
+    if any(k in text for k in ["笑话", "搞笑", "逗我笑"]):
+        return "joke", None
+    return "chat", None
+
+def bench(func, lines, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for line in lines:
+            func(line)
+    elapsed = time.perf_counter() - start
+    return elapsed / (rounds * len(lines)) * 1e6
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="意图路由基准测试")
+    parser.add_argument("corpus", nargs="?", default=str(CORPUS_FILE))
+    parser.add_argument("-n", "--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(args.corpus, "r", encoding="utf-8") as f:
+        lines = [line.strip() for line in f if line.strip()]
+
+    legacy_us = bench(legacy_route, lines, args.rounds)
+    router_us = bench(route, lines, args.rounds)
+    print(f"语料 {len(lines)} 句 × {args.rounds} 轮")
+    print(f"旧版链式判断: {legacy_us:.2f} µs/句")
+    print(f"意图路由器:   {router_us:.2f} µs/句")
+
+    diffs = [(line, legacy_route(line)[0], route(line)[0]) for line in lines
+             if legacy_route(line)[0] != route(line)[0]]
+    if diffs:
+        print(f"\n意图不同的句子 {len(diffs)} 条：")
+        for line, old, new in diffs:
+            print(f"  {line}: {old} -> {new}")
+
+    queries = [(line, legacy_route(line)[1], route(line)[1]["rest"]) for line in lines
+               if legacy_route(line)[0] == route(line)[0] == "search"
+               and legacy_route(line)[1] != route(line)[1]["rest"]]
+    if queries:
+        print(f"\n搜索关键词不同的句子 {len(queries)} 条：")
+        for line, old, new in queries:
+            print(f"  {line}: {old!r} -> {new!r}")
@@ -66,64 +66,75 @@ class QQBot:
 # 全局机器人实例
 bot = QQBot()
 
+# 一条消息里所有技能的总截止时间（秒）
+BOT_DEADLINE = 20
+
+def skill_call_for(intent, slots, text):
+    """意图 -> (技能名, 参数)"""
+    if intent == "search":
+        return "search", {"query": slots["rest"]}
+    if intent == "weather":
+        return "weather", {"city": slots["city"]}
+    if intent == "story":
+        return "story", {"topic": slots["topic"]}
+    if intent == "joke":
+        return "joke", None
+    if intent == "reminder":
+        time_val = slots["hour"] + ":00" if slots["hour"] else "未知时间"
+        return "reminder", {"time": time_val, "content": text}
+    if intent == "music":
+        return "music", {"song": slots["song"] or slots["rest"]}
+    return None
+
+def format_reply(skill_name, result):
+    """技能结果 -> 回复文字"""
+    if not result.get("success"):
+        return result.get("message", "")
+    if skill_name == "search":
+        reply = "搜索结果：\n"
+        for r in result.get("results", [])[:3]:
+            reply += f"• {r.get('title', '')}\n"
+            reply += f"  {r.get('snippet', '')}...\n"
+        return reply
+    if skill_name == "weather":
+        return result.get("weather", "")
+    if skill_name == "story":
+        return result.get("story", "")
+    if skill_name == "joke":
+        return result.get("joke", "")
+    return result.get("message", "")
+
 def process_incoming_message(text, sender=None):
-    """处理从QQ/微信接收的消息"""
+    """处理从QQ/微信接收的消息
+    一句话命中多个意图时（如「讲个笑话，再说说北京天气」），只读技能并发执行，回复合并
+    """
     print(f"收到消息 from {sender}: {text}")
     
     # 导入skill系统
     import sys
     sys.path.insert(0, str(Path(__file__).parent))
-    from skills import execute_skill, get_skill
+    from skills import run_skills, get_skill_meta
     from model_manager import chat
+    from intent_router import match_all
     
-    text_lower = text.lower()
-    
-    # 解析命令
-    if "搜索" in text or "查一下" in text or "search" in text_lower:
-        # 提取搜索关键词
-        query = text.replace("搜索", "").replace("查一下", "").replace("search", "").strip()
-        result = execute_skill("search", {"query": query})
-        if result.get("success"):
-            reply = "搜索结果：\n"
-            for r in result.get("results", [])[:3]:
-                reply += f"• {r.get('title', '')}\n"
-                reply += f"  {r.get('snippet', '')}...\n"
-            return reply
-    
-    elif "天气" in text:
-        import re
-        city_match = re.search(r'(北京|上海|广州|深圳|杭州|南京|成都|武汉|西安|重庆)', text)
-        city = city_match.group(1) if city_match else "上海"
-        result = execute_skill("weather", {"city": city})
-        return result.get("weather", "")
+    calls = []
+    for i, (intent, slots) in enumerate(match_all(text)):
+        call = skill_call_for(intent, slots, text)
+        if not call:
+            continue
+        # 除了最优先的意图，有副作用的技能（如设提醒）不顺带执行
+        meta = get_skill_meta(call[0])
+        if i > 0 and not (meta and meta.get("readonly")):
+            continue
+        calls.append(call)
     
-    elif "讲故事" in text or "故事" in text:
-        topic = None
-        for t in ["小红帽", "三只小猪", "丑小鸭", "白雪公主", "灰姑娘"]:
-            if t in text:
-                topic = t
-                break
-        result = execute_skill("story", {"topic": topic})
-        return result.get("story", "")
-    
-    elif "笑话" in text or "搞笑" in text:
-        result = execute_skill("joke")
-        return result.get("joke", "")
-    
-    elif "提醒" in text or "叫我" in text:
-        import re
-        time_match = re.search(r'(\d+)[点时]', text)
-        time_val = time_match.group(1) + ":00" if time_match else "未知时间"
-        result = execute_skill("reminder", {"time": time_val, "content": text})
-        return result.get("message", "")
-    
-    elif "放歌" in text or "听歌" in text:
-        result = execute_skill("music", {"song": text.replace("放歌", "").replace("听歌", "").strip()})
-        return result.get("message", "")
-    
-    else:
+    if not calls:
         # 默认对话
-        return chat(text)
+        return chat(text).get("reply", "")
+    
+    results = run_skills(calls, timeout=BOT_DEADLINE)
+    replies = [format_reply(name, r) for (name, _), r in zip(calls, results)]
+    return "\n\n".join(r for r in replies if r)
 
 if __name__ == "__main__":
     # 测试
@@ -29,47 +29,11 @@ def chat(text):
     return result.get("reply", "抱歉，我没有听清楚")
 
 def search(query):
-    """联网搜索"""
-    try:
-        # 尝试使用 DuckDuckGo HTML
-        url = f"https://html.duckduckgo.com/html/?q={query}"
-        result = subprocess.run(
-            ["curl", "-s", "--max-time", "10", url],
-            capture_output=True, text=True
-        )
-        if result.stdout:
-            # 简单解析
-            lines = result.stdout.split('\n')
-            results = []
-            for line in lines:
-                if 'a href="https://' in line and 'result__' in line:
-                    # 提取标题和链接
-                    import re
-                    match = re.search(r'>([^<]+)</a>', line)
-                    if match and len(results) < 3:
-                        title = match.group(1)
-                        url_match = re.search(r'href="([^"]+)"', line)
-                        url = url_match.group(1) if url_match else ""
-                        results.append({"title": title, "url": url})
-            if results:
-                return results
-    except:
-        pass
-    
-    # 备用：使用百度
-    try:
-        url = f"https://www.baidu.com/s?wd={query}&rn=3"
-        result = subprocess.run(
-            ["curl", "-s", "--max-time", "10", url],
-            capture_output=True, text=True
-        )
-        if result.stdout:
-            import re
-            titles = re.findall(r'aria-label="([^"]+)"', result.stdout)[:3]
-            return [{"title": t, "url": f"https://www.baidu.com/s?wd={query}"} for t in titles]
-    except:
-        pass
-    
+    """联网搜索（多个搜索源同时查询，取最先返回的）"""
+    from search_backend import search as web_search
+    results = web_search(query, limit=3)
+    if results:
+        return results
     return [{"title": "搜索失败", "url": "", "snippet": "请稍后重试"}]
 
 def tell_story(topic=None):
@@ -112,18 +76,10 @@ def tell_joke():
     return jokes[datetime.now().second % len(jokes)]
 
 def set_reminder(time, content):
-    """设置提醒"""
+    """设置提醒（追加到 reminders.jsonl）"""
+    from jsonlog import get_log
     reminder = {"time": time, "content": content, "created_at": datetime.now().isoformat()}
-    
-    path = MEMORY_DIR / "reminders.json"
-    if path.exists():
-        data = json.load(open(path))
-    else:
-        data = {"reminders": []}
-    
-    data["reminders"].append(reminder)
-    with open(path, "w") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    get_log(MEMORY_DIR / "reminders.jsonl", legacy_key="reminders").append(reminder)
     
     return f"⏰ 已设置提醒：{time} {content}"
 
@@ -131,15 +87,12 @@ def set_reminder(time, content):
 
 def parse_command(text):
     """解析用户命令"""
-    text_lower = text.lower()
+    from intent_router import route
+    intent, slots = route(text)
     
     # 搜索
-    if any(k in text for k in ["搜索", "查一下", "search", "查"]):
-        import re
-        query = text
-        for k in ["搜索", "查一下", "search", "查"]:
-            query = query.replace(k, "")
-        query = query.strip()
+    if intent == "search":
+        query = slots["rest"]
         if query:
             results = search(query)
             reply = "🔍 搜索结果：\n"
@@ -149,40 +102,24 @@ def parse_command(text):
         return "search", "请提供搜索关键词"
     
     # 讲故事
-    if any(k in text for k in ["讲故事", "故事", "讲个故事"]):
-        topic = None
-        for t in ["小红帽", "三只小猪", "丑小鸭", "皇帝的新装", "白雪公主", "灰姑娘"]:
-            if t in text:
-                topic = t
-                break
-        return "story", tell_story(topic)
+    if intent == "story":
+        return "story", tell_story(slots["topic"])
     
     # 音乐
-    if any(k in text for k in ["放歌", "听歌", "播放", "音乐"]):
-        song = None
-        songs = ["童年", "简单爱", "夜空中最亮的星", "平凡之路"]
-        for s in songs:
-            if s in text:
-                song = s
-                break
-        return "music", play_music(song)
+    if intent == "music":
+        return "music", play_music(slots["song"])
     
     # 天气
-    if any(k in text for k in ["天气", "气温", "温度"]):
-        import re
-        city_match = re.search(r'(北京|上海|广州|深圳|杭州|南京|成都|武汉|西安|重庆)', text)
-        city = city_match.group(1) if city_match else "上海"
-        return "weather", get_weather(city)
+    if intent == "weather":
+        return "weather", get_weather(slots["city"])
     
     # 提醒
-    if any(k in text for k in ["提醒", "叫我", "定个闹钟"]):
-        import re
-        time_match = re.search(r'(\d+)[点时]', text)
-        time = time_match.group(1) + ":00" if time_match else "未知时间"
+    if intent == "reminder":
+        time = slots["hour"] + ":00" if slots["hour"] else "未知时间"
         return "reminder", set_reminder(time, text)
     
     # 笑话
-    if any(k in text for k in ["笑话", "搞笑", "逗我笑"]):
+    if intent == "joke":
         return "joke", tell_joke()
     
     # 默认对话
@@ -221,20 +158,13 @@ def feedback_api():
     data = request.json
     text = data.get('text', '')
     
-    # 保存反馈
-    feedback_file = MEMORY_DIR / "feedbacks.json"
-    feedbacks = {"feedbacks": []}
-    if feedback_file.exists():
-        feedbacks = json.load(open(feedback_file))
-    
-    feedbacks["feedbacks"].append({
+    # 保存反馈（追加一行，不重写整个文件）
+    from jsonlog import get_log
+    get_log(MEMORY_DIR / "feedbacks.jsonl", legacy_key="feedbacks").append({
         "text": text,
         "time": datetime.now().isoformat()
     })
     
-    with open(feedback_file, "w") as f:
-        json.dump(feedbacks, f, ensure_ascii=False, indent=2)
-    
     return jsonify({"success": True})
 
 @app.route('/api/status')
@@ -242,6 +172,12 @@ def status_api():
     from model_manager import get_status
     return jsonify(get_status())
 
+@app.route('/api/skills/cache')
+def skill_cache_api():
+    """技能缓存命中率"""
+    from skills import cache_stats
+    return jsonify(cache_stats())
+
 # ========== QQ/微信消息处理 ==========
 
 @app.route('/api/bot', methods=['POST'])
@@ -252,7 +188,9 @@ def bot_api():
     sender = data.get('sender', 'unknown')
     
     if message:
-        cmd_type, reply = parse_command(message)
+        # 交给消息处理器：多个技能并发执行，总耗时不超过截止时间
+        from bot_handler import process_incoming_message
+        reply = process_incoming_message(message, sender)
         return jsonify({
             "success": True,
             "reply": reply,
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+意图路由 - home_assistant 和 bot_handler 共用
+意图表声明关键词、实体词（城市、故事、歌曲）和正则槽位，
+启动时编译成一个 Aho-Corasick 自动机，一次扫描找出所有关键词和实体
+"""
+
+import re
+
+STORY_TOPICS = ["小红帽", "三只小猪", "丑小鸭", "皇帝的新装", "白雪公主", "灰姑娘", "狼来了"]
+SONGS = ["童年", "简单爱", "夜空中最亮的星", "平凡之路"]
+CITIES = ["北京", "上海", "广州", "深圳", "杭州", "南京", "成都", "武汉", "西安", "重庆"]
+
+# 意图表：按优先级排列，一句话命中多个意图时取靠前的
+# keywords: 触发词；entities: 槽位名 -> 候选词；patterns: 槽位名 -> 正则；defaults: 槽位默认值
+INTENTS = [
+    {"name": "search", "keywords": ["搜索", "查一下", "search"]},
+    {"name": "story", "keywords": ["讲故事", "故事", "讲个故事"], "entities": {"topic": STORY_TOPICS}},
+    {"name": "music", "keywords": ["放歌", "听歌", "播放", "音乐"], "entities": {"song": SONGS}},
+    {"name": "weather", "keywords": ["天气", "气温", "温度"], "entities": {"city": CITIES},
+     "defaults": {"city": "上海"}},
+    {"name": "reminder", "keywords": ["提醒", "叫我", "定个闹钟"], "patterns": {"hour": r"(\d+)[点时]"}},
+    {"name": "joke", "keywords": ["笑话", "搞笑", "逗我笑"]},
+]
+
+class AhoCorasick:
+    """多模式串匹配，扫描一遍文本得到所有命中 (起始位置, 词)"""
+
+    def __init__(self, words):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        for word in words:
+            self._insert(word)
+        self._build()
+
+    def _insert(self, word):
+        node = 0
+        for ch in word:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            node = nxt
+        self.output[node].append(word)
+
+    def _build(self):
+        # 计算失败指针，再展开成完整的状态转移表（DFA），扫描时不用回退
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+
+        self.delta = [None] * len(self.goto)
+        self.delta[0] = dict(self.goto[0])
+        for node in queue:  # BFS 顺序，失败指针指向的状态一定已经展开
+            self.delta[node] = {**self.delta[self.fail[node]], **self.goto[node]}
+
+    def find_all(self, text):
+        delta = self.delta
+        output = self.output
+        node = 0
+        hits = []
+        for i, ch in enumerate(text):
+            node = delta[node].get(ch, 0)
+            if output[node]:
+                for word in output[node]:
+                    hits.append((i - len(word) + 1, word))
+        return hits
+
+class IntentRouter:
+    def __init__(self, intents=INTENTS):
+        self.intents = intents
+        self.keyword_owner = {}     # 关键词 -> [意图名]
+        self.entity_owner = {}      # 实体词 -> [槽位名]
+        self.patterns = {}
+        for intent in intents:
+            for kw in intent.get("keywords", []):
+                self.keyword_owner.setdefault(kw.lower(), []).append(intent["name"])
+            for slot, values in intent.get("entities", {}).items():
+                for v in values:
+                    self.entity_owner.setdefault(v.lower(), []).append(slot)
+            for slot, pattern in intent.get("patterns", {}).items():
+                self.patterns[(intent["name"], slot)] = re.compile(pattern)
+        self.matcher = AhoCorasick(set(self.keyword_owner) | set(self.entity_owner))
+
+    def _scan(self, text):
+        """一次扫描：命中的意图、触发词位置 (起, 止, 所属意图)、实体"""
+        matched = set()
+        spans = []
+        entities = {}
+        for pos, word in self.matcher.find_all(text.lower()):
+            owners = self.keyword_owner.get(word)
+            if owners:
+                matched.update(owners)
+                spans.append((pos, pos + len(word), owners))
+            for slot in self.entity_owner.get(word, ()):
+                entities.setdefault(slot, word)  # 同一槽位取最先出现的
+        return matched, spans, entities
+
+    def _slots(self, intent, text, spans, entities):
+        slots = dict(intent.get("defaults", {}))
+        slots["text"] = text
+        # 去掉本意图的触发词后的剩余文字（如搜索关键词）；
+        # 别的意图的触发词是内容的一部分（「搜索天气预报」搜的是「天气预报」）
+        pieces = []
+        last = 0
+        for start, end, owners in sorted(spans):
+            if intent["name"] not in owners:
+                continue
+            if start > last:
+                pieces.append(text[last:start])
+            last = max(last, end)
+        pieces.append(text[last:])
+        slots["rest"] = "".join(pieces).strip()
+        for slot in intent.get("entities", {}):
+            slots[slot] = entities.get(slot, slots.get(slot))
+        for slot in intent.get("patterns", {}):
+            m = self.patterns[(intent["name"], slot)].search(text)
+            slots[slot] = m.group(1) if m else None
+        return slots
+
+    def match(self, text):
+        """返回命中的所有意图 [(意图名, 槽位), ...]，按优先级排序"""
+        matched, spans, entities = self._scan(text)
+        return [(intent["name"], self._slots(intent, text, spans, entities))
+                for intent in self.intents if intent["name"] in matched]
+
+    def route(self, text):
+        """返回优先级最高的意图，没有命中时为 chat"""
+        matched, spans, entities = self._scan(text)
+        for intent in self.intents:
+            if intent["name"] in matched:
+                return intent["name"], self._slots(intent, text, spans, entities)
+        return "chat", {"text": text, "rest": text.strip()}
+
+# 模块加载时编译一次
+ROUTER = IntentRouter()
+
+def route(text):
+    return ROUTER.route(text)
+
+def match_all(text):
+    return ROUTER.match(text)
+
+if __name__ == "__main__":
+    for t in ["今天北京天气怎么样", "给我讲个小红帽的故事", "搜索python教程", "明天8点提醒我开会", "放歌 平凡之路", "你好"]:
+        print(t, "->", route(t))
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+只追加的 JSONL 日志（反馈、提醒等）
+每条记录一行，写入不需要读出整个文件；
+后台写线程把同时到达的记录合并成一次 write + 一次 fsync（组提交），
+一家人同时发反馈/设提醒时每条的写入代价不随文件变大而增加
+"""
+
+import json
+import os
+import queue
+import threading
+from pathlib import Path
+
+TAIL_BLOCK = 8192
+
+class _Pending:
+    __slots__ = ("line", "done", "error")
+
+    def __init__(self, line):
+        self.line = line
+        self.done = threading.Event()
+        self.error = None
+
+class JsonlLog:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.queue = queue.Queue()
+        self.writer = None
+        self.lock = threading.Lock()
+
+    def _ensure_writer(self):
+        with self.lock:
+            if self.writer is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self.writer = threading.Thread(target=self._write_loop, name=f"jsonlog-{self.path.stem}", daemon=True)
+                self.writer.start()
+
+    def _write_loop(self):
+        while True:
+            batch = [self.queue.get()]
+            # 上一次 fsync 期间到达的记录一起提交
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            error = None
+            try:
+                with open(self.path, "ab") as f:
+                    f.write(b"".join(p.line for p in batch))
+                    f.flush()
+                    os.fsync(f.fileno())
+            except OSError as e:
+                error = e
+            for p in batch:
+                p.error = error
+                p.done.set()
+
+    def append(self, record, wait=True):
+        """追加一条记录；wait=True 时等到落盘（fsync）后返回"""
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        pending = _Pending(line)
+        self._ensure_writer()
+        self.queue.put(pending)
+        if wait:
+            pending.done.wait()
+            if pending.error:
+                raise pending.error
+
+    def iter_records(self):
+        """从头逐行读取，不整体加载；写了一半的行（断电）跳过"""
+        if not self.path.exists():
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    pass
+
+    def tail(self, n=20):
+        """最后 n 条记录（从文件末尾往前读块，不扫描整个文件）"""
+        if n <= 0 or not self.path.exists():
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            data = b""
+            while pos > 0 and data.count(b"\n") <= n:
+                step = min(TAIL_BLOCK, pos)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+        records = []
+        for line in data.splitlines()[-n:]:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                pass
+        return records
+
+def migrate_json(log, json_path, key):
+    """旧格式 {"key": [...]} 的 JSON 文件转成 JSONL，转换后旧文件改名为 .bak"""
+    json_path = Path(json_path)
+    if not json_path.exists() or log.path.exists():
+        return 0
+    try:
+        with open(json_path, "r", encoding="utf-8") as f:
+            items = json.load(f).get(key, [])
+    except Exception:
+        return 0
+    log.path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = log.path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        for item in items:
+            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+    os.replace(tmp, log.path)
+    os.replace(json_path, json_path.with_suffix(".json.bak"))
+    return len(items)
+
+# 同一个文件在进程内只有一个写线程
+_LOGS = {}
+_LOGS_LOCK = threading.Lock()
+
+def get_log(path, legacy_key=None):
+    """取得日志对象；legacy_key 给出时，同名 .json 旧文件会先迁移过来"""
+    path = Path(path).resolve()
+    with _LOGS_LOCK:
+        log = _LOGS.get(path)
+        if log is None:
+            log = JsonlLog(path)
+            if legacy_key:
+                migrate_json(log, path.with_suffix(".json"), legacy_key)
+            _LOGS[path] = log
+        return log
+
+if __name__ == "__main__":
+    import sys
+    import tempfile
+    import time
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with tempfile.TemporaryDirectory() as d:
+        log = get_log(Path(d) / "bench.jsonl")
+        start = time.time()
+        threads = [threading.Thread(target=lambda i=i: log.append({"i": i, "text": "反馈"})) for i in range(n)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.time() - start
+        print(f"{n} 条并发追加 {elapsed:.2f}s，共 {sum(1 for _ in log.iter_records())} 条，最后: {log.tail(2)}")
@@ -52,8 +52,11 @@ def save_config(config):
     with open(CONFIG_FILE, "w") as f:
         json.dump(config, f, ensure_ascii=False, indent=2)
 
-def chat(text, model=None):
-    """通用对话接口"""
+def chat(text, model=None, timeout=None, run_command=None):
+    """通用对话接口
+    timeout: 本次调用最多等多久（秒），不传用各接口的默认值
+    run_command: 代替 subprocess.run 运行本地模型（技能里传 Skill.run_command，调用取消时能杀掉子进程）
+    """
     config = load_config()
     
     # 选择模型
@@ -64,24 +67,25 @@ def chat(text, model=None):
     
     # 优先使用启用的模型
     if current == "ollama" and config["ollama"]["enabled"]:
-        return chat_ollama(text, config["ollama"])
+        return chat_ollama(text, config["ollama"], timeout or 60, run_command)
     elif current == "openai" and config["openai"]["enabled"]:
-        return chat_openai(text, config["openai"])
+        return chat_openai(text, config["openai"], timeout or 30)
     elif current == "qwen" and config["qwen"]["enabled"]:
-        return chat_qwen(text, config["qwen"])
+        return chat_qwen(text, config["qwen"], timeout or 30)
     elif current == "ernie" and config["ernie"]["enabled"]:
-        return chat_ernie(text, config["ernie"])
+        return chat_ernie(text, config["ernie"], timeout or 30)
     else:
         # 回退到本地Ollama
-        return chat_ollama(text, config["ollama"])
+        return chat_ollama(text, config["ollama"], timeout or 60, run_command)
 
-def chat_ollama(text, config):
+def chat_ollama(text, config, timeout=60, run_command=None):
     """本地Ollama"""
     try:
-        result = subprocess.run(
-            ["ollama", "run", config["model"], text],
-            capture_output=True, text=True, timeout=60
-        )
+        args = ["ollama", "run", config["model"], text]
+        if run_command:
+            result = run_command(args, timeout=timeout)
+        else:
+            result = subprocess.run(args, capture_output=True, text=True, timeout=timeout)
         return {
             "success": True,
             "reply": result.stdout.strip() if result.stdout else "抱歉，我没有听清楚",
@@ -94,7 +98,7 @@ def chat_ollama(text, config):
             "model": "ollama"
         }
 
-def chat_openai(text, config):
+def chat_openai(text, config, timeout=30):
     """OpenAI API"""
     try:
         import requests
@@ -111,7 +115,7 @@ def chat_openai(text, config):
             f"{config['endpoint']}/chat/completions",
             headers=headers,
             json=data,
-            timeout=30
+            timeout=timeout
         )
         result = resp.json()
         return {
@@ -126,7 +130,7 @@ def chat_openai(text, config):
             "model": "openai"
         }
 
-def chat_qwen(text, config):
+def chat_qwen(text, config, timeout=30):
     """阿里通义千问"""
     try:
         import requests
@@ -143,7 +147,7 @@ def chat_qwen(text, config):
             f"{config['endpoint']}/chat/completions",
             headers=headers,
             json=data,
-            timeout=30
+            timeout=timeout
         )
         result = resp.json()
         return {
@@ -158,7 +162,7 @@ def chat_qwen(text, config):
             "model": "qwen"
         }
 
-def chat_ernie(text, config):
+def chat_ernie(text, config, timeout=30):
     """百度文心一言"""
     try:
         import requests
@@ -174,7 +178,7 @@ def chat_ernie(text, config):
             f"{config['endpoint']}/chat/completions",
             headers=headers,
             json=data,
-            timeout=30
+            timeout=timeout
         )
         result = resp.json()
         return {
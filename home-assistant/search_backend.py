@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+联网搜索后端
+多个搜索源同时请求（复用 HTTP 连接池），取最先返回有效结果的那个，其余取消；
+也可以在截止时间内合并各家结果
+"""
+
+import html
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from urllib.parse import urlparse, parse_qs, unquote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_DEADLINE = 8    # 秒
+CHUNK_SIZE = 16 * 1024
+MAX_BODY = 2 * 1024 * 1024
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36",
+    "Accept-Language": "zh-CN,zh;q=0.9",
+}
+
+_session = None
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="search")
+_lock = threading.Lock()
+
+class Cancelled(Exception):
+    pass
+
+def get_session():
+    """全局共享的 HTTP 会话（连接池）"""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+            _session.headers.update(HEADERS)
+        return _session
+
+def fetch(url, params, cancel, timeout):
+    """流式读取响应，取消时立即断开连接"""
+    with get_session().get(url, params=params, timeout=timeout, stream=True) as resp:
+        resp.raise_for_status()
+        body = b""
+        for chunk in resp.iter_content(CHUNK_SIZE):
+            if cancel.is_set():
+                raise Cancelled()
+            body += chunk
+            if len(body) > MAX_BODY:
+                break
+        return body.decode(resp.encoding or "utf-8", errors="replace")
+
+def strip_tags(text):
+    return html.unescape(re.sub(r"<[^>]+>", "", text)).strip()
+
+# ========== 搜索源 ==========
+
+def search_duckduckgo(query, cancel, timeout):
+    page = fetch("https://html.duckduckgo.com/html/", {"q": query}, cancel, timeout)
+    results = []
+    links = re.findall(r'class="result__a"[^>]*href="([^"]+)"[^>]*>(.*?)</a>', page, re.S)
+    snippets = re.findall(r'class="result__snippet"[^>]*>(.*?)</a>', page, re.S)
+    for i, (href, title) in enumerate(links):
+        # 结果链接是 duckduckgo 跳转地址，真实地址在 uddg 参数里
+        target = parse_qs(urlparse(html.unescape(href)).query).get("uddg", [href])[0]
+        results.append({
+            "title": strip_tags(title),
+            "url": unquote(target) if target.startswith("http") else target,
+            "snippet": strip_tags(snippets[i])[:100] if i < len(snippets) else "",
+        })
+    return results
+
+def search_baidu(query, cancel, timeout):
+    page = fetch("https://www.baidu.com/s", {"wd": query, "rn": 5}, cancel, timeout)
+    results = []
+    for href, title in re.findall(r'<h3[^>]*>\s*<a[^>]*href="([^"]+)"[^>]*>(.*?)</a>', page, re.S):
+        results.append({"title": strip_tags(title), "url": href, "snippet": ""})
+    if not results:
+        for title in re.findall(r'aria-label="([^"]+)"', page):
+            results.append({"title": html.unescape(title), "url": "", "snippet": ""})
+    return results
+
+def search_ddg_api(query, cancel, timeout):
+    page = fetch("https://ddg-api.vercel.app/search", {"q": query, "num": 5}, cancel, timeout)
+    return [{"title": r.get("title", ""), "url": r.get("url", ""), "snippet": r.get("snippet", "")[:100]}
+            for r in json.loads(page)]
+
+PROVIDERS = {
+    "duckduckgo": search_duckduckgo,
+    "baidu": search_baidu,
+    "ddg_api": search_ddg_api,
+}
+
+# ========== 竞速 / 合并 ==========
+
+def _run_provider(name, query, cancel, timeout):
+    try:
+        return name, [r for r in PROVIDERS[name](query, cancel, timeout) if r.get("title")]
+    except Exception:
+        return name, []
+
+def search(query, limit=3, deadline=DEFAULT_DEADLINE, merge=False, providers=None, cancel=None):
+    """同时查询多个搜索源
+    merge=False: 返回最先拿到的非空结果，其余请求取消
+    merge=True:  截止时间内收集各家结果，去重后交替合并
+    cancel: 外部取消信号（threading.Event），置位后立即停止等待
+    """
+    query = query.strip()
+    if not query:
+        return []
+    stop = threading.Event()    # 通知各搜索源停止
+    names = providers or list(PROVIDERS)
+    pending = {_executor.submit(_run_provider, n, query, stop, deadline) for n in names}
+    collected = {}
+
+    end = time.monotonic() + deadline
+    while pending and not (cancel and cancel.is_set()):
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=min(remaining, 0.2), return_when=FIRST_COMPLETED)
+        for f in done:
+            name, results = f.result()
+            if results:
+                collected[name] = results
+        if collected and not merge:
+            break
+
+    # 取消剩下的请求（未开始的直接取消，进行中的在下一个数据块断开）
+    stop.set()
+    for f in pending:
+        f.cancel()
+
+    if not collected:
+        return []
+    if not merge:
+        return next(iter(collected.values()))[:limit]
+
+    merged, seen = [], set()
+    ordered = [collected[n] for n in names if n in collected]
+    for i in range(max(len(r) for r in ordered)):
+        for results in ordered:
+            if i < len(results):
+                key = results[i]["url"] or results[i]["title"]
+                if key not in seen:
+                    seen.add(key)
+                    merged.append(results[i])
+    return merged[:limit]
+
+if __name__ == "__main__":
+    import sys
+    q = " ".join(sys.argv[1:]) or "python"
+    start = time.time()
+    for r in search(q, limit=5):
+        print(f"• {r['title']}  {r['url']}")
+    print(f"耗时 {time.time() - start:.2f}s")
@@ -2,221 +2,279 @@
 """
 Skill系统 - 功能模块化
 让每个功能都可以独立复用
+
+技能按插件发现，用到时才导入：
+- 本目录下每个模块一个技能，模块顶部的 SKILL 字典声明元数据
+- 其他包可通过 entry points（组名 home_assistant.skills）注册技能
+元数据直接解析源码得到，列出技能不会导入任何技能模块，所以 SKILL 只能写字面量
+
+SKILL 字段（未写的取 DEFAULT_META）：
+    name         技能名，技能类的 name 直接取这里
+    class        技能类名，用到时才导入模块取这个类
+    description  说明，技能类的 description 直接取这里
+    intents      处理的意图
+    timeout      超时（秒）
+    concurrency  同时执行的上限
+    readonly     没有副作用，可以跟别的意图一起顺带执行
+    cacheable    结果可缓存；cache_key 参与缓存键的参数，ttl 有效期，stale 过期后还能先返回旧结果的时长（秒）
+
+执行在线程池里进行：每个技能有超时和并发上限，超时或取消时正在跑的外部命令会被杀掉
+声明了 cacheable 的技能按 cache_key 字段缓存结果 ttl 秒，过期后 stale 秒内先返回旧结果并后台刷新
 """
 
-import json
-import subprocess
+import ast
+import importlib
+import importlib.util
+import threading
+import time
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from pathlib import Path
-from datetime import datetime
 
-SKILL_DIR = Path(__file__).parent
-SKILLS_DIR = SKILL_DIR / "skills"
-SKILLS_DIR.mkdir(exist_ok=True)
+from .base import Skill, SkillCancelled, SKILL_DIR, set_current_call
+from .cache import SkillCache
 
-class Skill:
-    """技能基类"""
-    name = "base"
-    description = "基础技能"
-    
-    def run(self, params=None):
-        """执行技能"""
-        return {"success": False, "message": "Not implemented"}
-    
-    def help(self):
-        """帮助信息"""
-        return self.description
-
-class SearchSkill(Skill):
-    """联网搜索技能"""
-    name = "search"
-    description = "联网搜索信息"
-    
-    def run(self, params=None):
-        query = params.get("query", "") if params else ""
-        if not query:
-            return {"success": False, "message": "请提供搜索关键词"}
-        
-        try:
-            # 使用ddg搜索
-            result = subprocess.run(
-                ["ddgr", "-n", "5", "--json", query],
-                capture_output=True, text=True, timeout=30
-            )
-            if result.returncode == 0:
-                # 解析结果
-                lines = result.stdout.strip().split('\n')
-                results = []
-                for line in lines[:3]:
-                    try:
-                        data = json.loads(line)
-                        results.append({
-                            "title": data.get("title", ""),
-                            "url": data.get("url", ""),
-                            "snippet": data.get("body", "")[:100]
-                        })
-                    except:
-                        pass
-                return {"success": True, "results": results}
-        except:
-            pass
-        
-        # 备用：用curl搜索
-        try:
-            url = f"https://ddg-api.vercel.app/search?q={query}&num=3"
-            result = subprocess.run(
-                ["curl", "-s", url],
-                capture_output=True, text=True, timeout=15
-            )
-            if result.stdout:
-                data = json.loads(result.stdout)
-                results = [{"title": r.get("title",""), "url": r.get("url",""), "snippet": r.get("snippet","")[:100]} for r in data]
-                return {"success": True, "results": results}
-        except:
-            pass
-        
-        return {"success": False, "message": "搜索失败，请稍后重试"}
-
-class WeatherSkill(Skill):
-    """天气查询技能"""
-    name = "weather"
-    description = "查询天气"
-    
-    def run(self, params=None):
-        city = params.get("city", "上海") if params else "上海"
-        try:
-            result = subprocess.run(
-                ["curl", "-s", f"wttr.in/{city}?format=%c%t+%h+%p"],
-                capture_output=True, text=True, timeout=10
-            )
-            if result.stdout:
-                info = result.stdout.strip()
-                return {"success": True, "weather": f"🌤️ {city}: {info}"}
-        except:
-            pass
-        return {"success": True, "weather": f"🌤️ {city}天气不错"}
-
-class StorySkill(Skill):
-    """讲故事技能"""
-    name = "story"
-    description = "讲故事"
-    
-    STORIES = {
-        "小红帽": "从前有个可爱的小女孩，叫小红帽...",
-        "三只小猪": "从前有三只小猪...",
-        "丑小鸭": "从前有一只丑小鸭...",
-    }
-    
-    def run(self, params=None):
-        topic = params.get("topic") if params else None
-        if not topic:
-            topic = list(self.STORIES.keys())[datetime.now().second % len(self.STORIES)]
-        
-        # 用AI生成故事
-        from model_manager import chat
-        prompt = f"用适合5岁小朋友的方式，简短讲一下《{topic}》的故事（50字以内）"
-        story = chat(prompt)
-        
-        return {"success": True, "story": story, "topic": topic}
-
-class MusicSkill(Skill):
-    """音乐播放技能"""
-    name = "music"
-    description = "播放音乐"
-    
-    def run(self, params=None):
-        song = params.get("song") if params else None
-        if song:
-            return {"success": True, "message": f"🎵 正在播放: {song}"}
-        return {"success": True, "message": "你想听什么歌呢？"}
-
-class JokeSkill(Skill):
-    """讲笑话技能"""
-    name = "joke"
-    description = "讲笑话"
-    
-    JOKES = [
-        "为什么数学书总是很伤心？因为它们有太多的难题！",
-        "小明的妈妈为什么买洗衣机？因为爸爸太会'甩'锅了！",
-        "为什么电脑很勤奋？因为它每天都要'工作'！",
-    ]
-    
-    def run(self, params=None):
-        joke = self.JOKES[datetime.now().second % len(self.JOKES)]
-        return {"success": True, "joke": joke}
-
-class ReminderSkill(Skill):
-    """提醒技能"""
-    name = "reminder"
-    description = "设置提醒"
-    
-    def run(self, params=None):
-        if not params:
-            return {"success": False, "message": "请提供提醒内容"}
-        
-        time = params.get("time", "未知时间")
-        content = params.get("content", "")
-        
-        # 保存提醒
-        reminder_file = SKILL_DIR / "memory" / "reminders.json"
-        reminder_file.parent.mkdir(exist_ok=True)
-        
-        reminders = []
-        if reminder_file.exists():
-            reminders = json.load(open(reminder_file))["reminders"]
-        
-        reminders.append({
-            "time": time,
-            "content": content,
-            "created_at": datetime.now().isoformat()
-        })
-        
-        json.dump({"reminders": reminders}, open(reminder_file, "w"), ensure_ascii=False, indent=2)
-        
-        return {"success": True, "message": f"⏰ 已设置提醒：{time} {content}"}
-
-class QASkill(Skill):
-    """问答技能"""
-    name = "qa"
-    description = "百科问答"
-    
-    def run(self, params=None):
-        question = params.get("question", "") if params else ""
-        if not question:
-            return {"success": False, "message": "请提供问题"}
-        
-        from model_manager import chat
-        answer = chat(question)
-        return {"success": True, "answer": answer}
-
-# 注册所有技能
-SKILLS = {
-    "search": SearchSkill(),
-    "weather": WeatherSkill(),
-    "story": StorySkill(),
-    "music": MusicSkill(),
-    "joke": JokeSkill(),
-    "reminder": ReminderSkill(),
-    "qa": QASkill(),
-}
+ENTRY_POINT_GROUP = "home_assistant.skills"
+DEFAULT_META = {"intents": [], "timeout": 30, "cacheable": False, "concurrency": 4, "readonly": True,
+                "cache_key": [], "ttl": 0, "stale": 0}
+MAX_WORKERS = 16
+
+_META = None            # 技能名 -> 元数据
+_INSTANCES = {}         # 技能名 -> 已创建的技能实例
+_LOCK = threading.Lock()
+
+def read_skill_meta(path):
+    """从模块源码中解析 SKILL 字典（不执行模块）"""
+    try:
+        tree = ast.parse(Path(path).read_text(encoding="utf-8"))
+    except (OSError, SyntaxError):
+        return None
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+                isinstance(t, ast.Name) and t.id == "SKILL" for t in node.targets):
+            try:
+                return ast.literal_eval(node.value)
+            except ValueError:
+                return None
+    return None
+
+def _discover():
+    """扫描插件目录和 entry points，只读元数据"""
+    registry = {}
+    for path in sorted(SKILL_DIR.glob("*.py")):
+        if path.stem in ("__init__", "__main__", "base", "cache"):
+            continue
+        meta = read_skill_meta(path)
+        if meta:
+            registry[meta["name"]] = {**DEFAULT_META, **meta, "module": f"{__name__}.{path.stem}"}
+
+    try:
+        from importlib.metadata import entry_points
+        eps = entry_points(group=ENTRY_POINT_GROUP)
+    except Exception:
+        eps = []
+    for ep in eps:
+        module, _, attr = ep.value.partition(":")
+        meta = None
+        spec = importlib.util.find_spec(module)
+        if spec and spec.origin:
+            meta = read_skill_meta(spec.origin)
+        meta = meta or {"name": ep.name, "class": attr}
+        registry.setdefault(meta["name"], {**DEFAULT_META, **meta, "module": module})
+    return registry
+
+def skill_registry():
+    """技能元数据（首次调用时发现）"""
+    global _META
+    if _META is None:
+        with _LOCK:
+            if _META is None:
+                _META = _discover()
+    return _META
+
+def get_skill_meta(name):
+    return skill_registry().get(name)
 
 def get_skill(name):
-    """获取技能"""
-    return SKILLS.get(name)
+    """获取技能（第一次使用时才导入模块）"""
+    skill = _INSTANCES.get(name)
+    if skill is not None:
+        return skill
+    meta = get_skill_meta(name)
+    if not meta:
+        return None
+    with _LOCK:
+        if name not in _INSTANCES:
+            module = importlib.import_module(meta["module"])
+            _INSTANCES[name] = getattr(module, meta["class"])()
+        return _INSTANCES[name]
+
+class _LazySkills(Mapping):
+    """兼容旧的 SKILLS 字典：按名字取技能时才导入"""
+
+    def __getitem__(self, name):
+        skill = get_skill(name)
+        if skill is None:
+            raise KeyError(name)
+        return skill
+
+    def __iter__(self):
+        return iter(skill_registry())
+
+    def __len__(self):
+        return len(skill_registry())
+
+SKILLS = _LazySkills()
 
 def list_skills():
     """列出所有技能"""
-    return [{"name": s.name, "description": s.description} for s in SKILLS.values()]
-
-def execute_skill(skill_name, params=None):
-    """执行技能"""
-    skill = get_skill(skill_name)
-    if skill:
-        return skill.run(params)
-    return {"success": False, "message": f"技能 {skill_name} 不存在"}
-
-if __name__ == "__main__":
-    # 测试
-    print("可用技能:", list_skills())
-    print("测试搜索:", execute_skill("search", {"query": "python"}))
-    print("测试天气:", execute_skill("weather", {"city": "上海"}))
-    print("测试笑话:", execute_skill("joke"))
+    return [{"name": name, "description": meta.get("description", "")} for name, meta in skill_registry().items()]
+
+# ========== 异步执行 ==========
+
+_EXECUTOR = None
+_SEMAPHORES = {}
+
+def _executor():
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        with _LOCK:
+            if _EXECUTOR is None:
+                _EXECUTOR = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="skill")
+    return _EXECUTOR
+
+def _semaphore(name, meta):
+    with _LOCK:
+        if name not in _SEMAPHORES:
+            _SEMAPHORES[name] = threading.BoundedSemaphore(meta["concurrency"])
+        return _SEMAPHORES[name]
+
+def _timeout_result(name):
+    return {"success": False, "timeout": True, "message": f"技能 {name} 超时"}
+
+class SkillCall:
+    """一次技能调用（future 风格）"""
+
+    def __init__(self, name, params, timeout):
+        self.name = name
+        self.params = params
+        self.deadline = time.monotonic() + timeout
+        self._cancel = threading.Event()
+        self.future = None
+
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        """取消：还没开始的不再执行，正在跑的外部命令会被杀掉"""
+        self._cancel.set()
+        if self.future:
+            self.future.cancel()
+
+    def done(self):
+        return self.future.done()
+
+    def result(self, timeout=None):
+        """等待结果，最多等到截止时间；超时则取消调用并返回超时结果"""
+        remaining = self.deadline - time.monotonic()
+        if timeout is not None:
+            remaining = min(remaining, timeout)
+        try:
+            return self.future.result(timeout=max(0, remaining))
+        except FutureTimeout:
+            self.cancel()
+            return _timeout_result(self.name)
+
+def _run_call(call, skill, semaphore):
+    """工作线程：排队等并发名额，然后执行"""
+    if not semaphore.acquire(timeout=max(0, call.deadline - time.monotonic())):
+        return _timeout_result(call.name)
+    set_current_call(call)
+    try:
+        if call.cancelled():
+            raise SkillCancelled(call.name)
+        return skill.run(call.params)
+    except SkillCancelled:
+        return {"success": False, "cancelled": True, "message": f"技能 {call.name} 已取消"}
+    finally:
+        set_current_call(None)
+        semaphore.release()
+
+# ========== 结果缓存 ==========
+
+CACHE = SkillCache()
+
+def _cache_key(name, meta, params):
+    params = params or {}
+    return (name,) + tuple(str(params.get(k)) for k in meta["cache_key"])
+
+def _cacheable_result(result):
+    """只缓存真正成功的结果（不缓存兜底回复）"""
+    return result.get("success") and not result.get("fallback")
+
+def _store_when_done(key, meta):
+    def callback(future):
+        if future.cancelled() or future.exception():
+            CACHE.end_refresh(key)
+            return
+        result = future.result()
+        if _cacheable_result(result):
+            CACHE.put(key, result, meta["ttl"], meta["stale"])
+        else:
+            CACHE.end_refresh(key)
+    return callback
+
+def cache_stats():
+    """各技能缓存命中情况"""
+    return CACHE.stats()
+
+# ========== 提交调用 ==========
+
+def _completed(call, result):
+    from concurrent.futures import Future
+    call.future = Future()
+    call.future.set_result(result)
+    return call
+
+def execute_skill_async(skill_name, params=None, timeout=None):
+    """提交技能调用，立即返回 SkillCall；timeout 默认取技能元数据里的值"""
+    meta = get_skill_meta(skill_name)
+    call = SkillCall(skill_name, params, timeout or (meta or DEFAULT_META)["timeout"])
+    skill = get_skill(skill_name) if meta else None
+    if skill is None:
+        return _completed(call, {"success": False, "message": f"技能 {skill_name} 不存在"})
+    
+    key = None
+    if meta["cacheable"] and meta["ttl"]:
+        key = _cache_key(skill_name, meta, params)
+        state, cached = CACHE.get(skill_name, key)
+        if state == "fresh":
+            return _completed(call, cached)
+        if state == "stale":
+            # 先返回旧结果，后台刷新（同一个 key 只刷新一次）
+            if CACHE.start_refresh(key):
+                refresh = SkillCall(skill_name, params, meta["timeout"])
+                refresh.future = _executor().submit(_run_call, refresh, skill, _semaphore(skill_name, meta))
+                refresh.future.add_done_callback(_store_when_done(key, meta))
+            return _completed(call, cached)
+    
+    call.future = _executor().submit(_run_call, call, skill, _semaphore(skill_name, meta))
+    if key:
+        call.future.add_done_callback(_store_when_done(key, meta))
+    return call
+
+def run_skills(calls, timeout=None):
+    """并发执行多个技能 [(技能名, 参数), ...]，结果按输入顺序返回
+    timeout 为整体截止时间，超过的调用返回超时结果
+    """
+    deadline = time.monotonic() + timeout if timeout else None
+    pending = [execute_skill_async(name, params) for name, params in calls]
+    results = []
+    for call in pending:
+        wait = max(0, deadline - time.monotonic()) if deadline else None
+        results.append(call.result(wait))
+    return results
+
+def execute_skill(skill_name, params=None, timeout=None):
+    """执行技能（同步，不会超过技能的截止时间）"""
+    return execute_skill_async(skill_name, params, timeout).result()
@@ -0,0 +1,12 @@
+"""
+技能自测: python3 -m skills
+"""
+
+from . import list_skills, execute_skill
+
+if __name__ == "__main__":
+    # 测试
+    print("可用技能:", list_skills())
+    print("测试搜索:", execute_skill("search", {"query": "python"}))
+    print("测试天气:", execute_skill("weather", {"city": "上海"}))
+    print("测试笑话:", execute_skill("joke"))
@@ -0,0 +1,72 @@
+"""
+技能基类
+"""
+
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+SKILL_DIR = Path(__file__).parent
+
+# 当前线程正在执行的技能调用（由注册表在工作线程里设置）
+_local = threading.local()
+
+class SkillCancelled(Exception):
+    """技能调用被取消或已超过截止时间"""
+
+def current_call():
+    return getattr(_local, "call", None)
+
+def set_current_call(call):
+    _local.call = call
+
+class Skill:
+    """技能基类"""
+    name = "base"
+    description = "基础技能"
+    
+    def run(self, params=None):
+        """执行技能"""
+        return {"success": False, "message": "Not implemented"}
+    
+    def help(self):
+        """帮助信息"""
+        return self.description
+    
+    def run_command(self, args, timeout):
+        """运行外部命令，调用被取消或到截止时间时立即杀掉子进程
+        用法同 subprocess.run(args, capture_output=True, text=True, timeout=timeout)
+        """
+        call = current_call()
+        deadline = time.monotonic() + timeout
+        if call:
+            deadline = min(deadline, call.deadline)
+            if call.cancelled():
+                raise SkillCancelled(self.name)
+        
+        proc = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        while True:
+            try:
+                stdout, stderr = proc.communicate(timeout=0.1)
+                return subprocess.CompletedProcess(args, proc.returncode, stdout, stderr)
+            except subprocess.TimeoutExpired:
+                pass
+            if call and call.cancelled():
+                proc.kill()
+                proc.communicate()
+                raise SkillCancelled(self.name)
+            if time.monotonic() >= deadline:
+                proc.kill()
+                proc.communicate()
+                raise subprocess.TimeoutExpired(args, timeout)
+    
+    def chat(self, text, timeout):
+        """调用对话模型，返回回复文本
+        不超过调用的截止时间；本地模型经 run_command 运行，调用被取消时子进程随之结束
+        """
+        from model_manager import chat
+        call = current_call()
+        if call:
+            timeout = max(min(timeout, call.deadline - time.monotonic()), 0.1)
+        return chat(text, timeout=timeout, run_command=self.run_command).get("reply", "")
@@ -0,0 +1,73 @@
+"""
+技能结果缓存
+LRU 限制条目数；过期后在 stale 窗口内先返回旧结果，后台刷新
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+MAX_ENTRIES = 512
+
+class SkillCache:
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()    # key -> (结果, 新鲜截止, 可用截止)
+        self.counters = {}              # 技能名 -> {"hits", "stale", "misses"}
+        self.refreshing = set()
+        self.lock = threading.Lock()
+
+    def _count(self, name, field):
+        c = self.counters.setdefault(name, {"hits": 0, "stale": 0, "misses": 0})
+        c[field] += 1
+
+    def get(self, name, key):
+        """返回 (状态, 结果)，状态为 fresh / stale / None"""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and now < entry[2]:
+                self.entries.move_to_end(key)
+                if now < entry[1]:
+                    self._count(name, "hits")
+                    return "fresh", entry[0]
+                self._count(name, "stale")
+                return "stale", entry[0]
+            if entry:
+                del self.entries[key]
+            self._count(name, "misses")
+            return None, None
+
+    def put(self, key, result, ttl, stale=0):
+        now = time.monotonic()
+        with self.lock:
+            self.entries[key] = (result, now + ttl, now + ttl + stale)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self.refreshing.discard(key)
+
+    def start_refresh(self, key):
+        """标记后台刷新，已在刷新中返回 False"""
+        with self.lock:
+            if key in self.refreshing:
+                return False
+            self.refreshing.add(key)
+            return True
+
+    def end_refresh(self, key):
+        with self.lock:
+            self.refreshing.discard(key)
+
+    def stats(self):
+        with self.lock:
+            result = {}
+            for name, c in self.counters.items():
+                total = c["hits"] + c["stale"] + c["misses"]
+                result[name] = {**c, "hit_rate": round((c["hits"] + c["stale"]) / total, 3) if total else 0}
+            result["_entries"] = len(self.entries)
+            return result
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
@@ -0,0 +1,33 @@
+"""
+技能 - 讲笑话
+"""
+
+from datetime import datetime
+
+from .base import Skill
+
+SKILL = {
+    "name": "joke",
+    "class": "JokeSkill",
+    "description": "讲笑话",
+    "intents": ["joke"],
+    "timeout": 5,
+    "cacheable": False,
+    "concurrency": 4,
+    "readonly": True,
+}
+
+class JokeSkill(Skill):
+    """讲笑话技能"""
+    name = SKILL["name"]
+    description = SKILL["description"]
+    
+    JOKES = [
+        "为什么数学书总是很伤心？因为它们有太多的难题！",
+        "小明的妈妈为什么买洗衣机？因为爸爸太会'甩'锅了！",
+        "为什么电脑很勤奋？因为它每天都要'工作'！",
+    ]
+    
+    def run(self, params=None):
+        joke = self.JOKES[datetime.now().second % len(self.JOKES)]
+        return {"success": True, "joke": joke}
@@ -0,0 +1,27 @@
+"""
+技能 - 音乐播放
+"""
+
+from .base import Skill
+
+SKILL = {
+    "name": "music",
+    "class": "MusicSkill",
+    "description": "播放音乐",
+    "intents": ["music"],
+    "timeout": 5,
+    "cacheable": False,
+    "concurrency": 4,
+    "readonly": True,
+}
+
+class MusicSkill(Skill):
+    """音乐播放技能"""
+    name = SKILL["name"]
+    description = SKILL["description"]
+    
+    def run(self, params=None):
+        song = params.get("song") if params else None
+        if song:
+            return {"success": True, "message": f"🎵 正在播放: {song}"}
+        return {"success": True, "message": "你想听什么歌呢？"}
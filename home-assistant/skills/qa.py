@@ -0,0 +1,29 @@
+"""
+技能 - 问答
+"""
+
+from .base import Skill
+
+SKILL = {
+    "name": "qa",
+    "class": "QASkill",
+    "description": "百科问答",
+    "intents": ["qa"],
+    "timeout": 60,
+    "cacheable": False,
+    "concurrency": 2,
+    "readonly": True,
+}
+
+class QASkill(Skill):
+    """问答技能"""
+    name = SKILL["name"]
+    description = SKILL["description"]
+    
+    def run(self, params=None):
+        question = params.get("question", "") if params else ""
+        if not question:
+            return {"success": False, "message": "请提供问题"}
+        
+        answer = self.chat(question, timeout=SKILL["timeout"])
+        return {"success": True, "answer": answer}
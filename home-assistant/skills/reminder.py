@@ -0,0 +1,41 @@
+"""
+技能 - 提醒
+"""
+
+from datetime import datetime
+
+from .base import Skill, SKILL_DIR
+
+SKILL = {
+    "name": "reminder",
+    "class": "ReminderSkill",
+    "description": "设置提醒",
+    "intents": ["reminder"],
+    "timeout": 5,
+    "cacheable": False,
+    "concurrency": 1,
+    "readonly": False,
+}
+
+class ReminderSkill(Skill):
+    """提醒技能"""
+    name = SKILL["name"]
+    description = SKILL["description"]
+    
+    def run(self, params=None):
+        if not params:
+            return {"success": False, "message": "请提供提醒内容"}
+        
+        time = params.get("time", "未知时间")
+        content = params.get("content", "")
+        
+        # 追加到 home-assistant/memory/reminders.jsonl（与网页端设置的提醒同一个文件）
+        from jsonlog import get_log
+        log = get_log(SKILL_DIR.parent / "memory" / "reminders.jsonl", legacy_key="reminders")
+        log.append({
+            "time": time,
+            "content": content,
+            "created_at": datetime.now().isoformat()
+        })
+        
+        return {"success": True, "message": f"⏰ 已设置提醒：{time} {content}"}
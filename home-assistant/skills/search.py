@@ -0,0 +1,41 @@
+"""
+技能 - 联网搜索
+"""
+
+import time
+
+from .base import Skill, current_call
+
+SKILL = {
+    "name": "search",
+    "class": "SearchSkill",
+    "description": "联网搜索信息",
+    "intents": ["search"],
+    "timeout": 45,
+    "cacheable": True,
+    "cache_key": ["query"],
+    "ttl": 3600,
+    "stale": 3600,
+    "concurrency": 2,
+    "readonly": True,
+}
+
+class SearchSkill(Skill):
+    """联网搜索技能"""
+    name = SKILL["name"]
+    description = SKILL["description"]
+    
+    def run(self, params=None):
+        query = params.get("query", "") if params else ""
+        if not query:
+            return {"success": False, "message": "请提供搜索关键词"}
+        
+        # 多个搜索源同时查询，不超过本次调用的截止时间；调用被取消时立即停止
+        from search_backend import search
+        call = current_call()
+        deadline = max(1, call.deadline - time.monotonic()) if call else 15
+        results = search(query, limit=3, deadline=min(deadline, 15), cancel=call._cancel if call else None)
+        if results:
+            return {"success": True, "results": results}
+        
+        return {"success": False, "message": "搜索失败，请稍后重试"}
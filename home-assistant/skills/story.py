@@ -0,0 +1,40 @@
+"""
+技能 - 讲故事
+"""
+
+from datetime import datetime
+
+from .base import Skill
+
+SKILL = {
+    "name": "story",
+    "class": "StorySkill",
+    "description": "讲故事",
+    "intents": ["story"],
+    "timeout": 60,
+    "cacheable": False,
+    "concurrency": 2,
+    "readonly": True,
+}
+
+class StorySkill(Skill):
+    """讲故事技能"""
+    name = SKILL["name"]
+    description = SKILL["description"]
+    
+    STORIES = {
+        "小红帽": "从前有个可爱的小女孩，叫小红帽...",
+        "三只小猪": "从前有三只小猪...",
+        "丑小鸭": "从前有一只丑小鸭...",
+    }
+    
+    def run(self, params=None):
+        topic = params.get("topic") if params else None
+        if not topic:
+            topic = list(self.STORIES.keys())[datetime.now().second % len(self.STORIES)]
+        
+        # 用AI生成故事
+        prompt = f"用适合5岁小朋友的方式，简短讲一下《{topic}》的故事（50字以内）"
+        story = self.chat(prompt, timeout=SKILL["timeout"])
+        
+        return {"success": True, "story": story, "topic": topic}
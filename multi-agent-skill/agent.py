@@ -49,12 +49,19 @@ def load_memory(agent_name: str) -> dict:
         "knowledge": []
     }
 
-def save_memory(agent_name: str, memory: dict):
+def save_memory(agent_name: str, memory: dict, loaded_mtime=None, appended=None):
     from datetime import datetime
     path = get_memory_path(agent_name)
     memory["last_updated"] = datetime.now().isoformat()
     with open(path, "w", encoding="utf-8") as f:
         json.dump(memory, f, ensure_ascii=False, indent=2)
+    PROMPT_CACHE.memory_saved(agent_name, memory, loaded_mtime, appended)
+
+# prompt 缓存：热点助手不必每次重读记忆和共享知识
+# 这里的 prompt 不按 token 预算裁剪，只放最近 HISTORY_TURNS 轮
+HISTORY_TURNS = 10
+from prompt_cache import PromptCache, file_mtime
+PROMPT_CACHE = PromptCache(get_memory_path, load_memory, SHARED_DIR / "knowledge.json", HISTORY_TURNS)
 
 def detect_agent(message: str, config: dict) -> tuple:
     """检测消息中的助手名字"""
@@ -88,35 +95,21 @@ def detect_agent(message: str, config: dict) -> tuple:
     return None, message
 
 def build_system_prompt(agent_name: str, config: dict) -> str:
-    """构建助手人格"""
+    """构建助手人格（按助手缓存，历史/共享知识变化时增量更新）"""
     agents = config.get("agents", {})
     agent = agents.get(agent_name, {})
     
     role = agent.get("role", "助手")
     desc = agent.get("description", "无描述")
     
-    # 加载历史
-    memory = load_memory(agent_name)
-    history = memory.get("history", [])[-10:]
-    
-    history_lines = []
-    for h in history:
-        role_label = "你" if h.get("role") == "assistant" else "用户"
-        history_lines.append(f"{role_label}: {h.get('content', '')}")
-    history_text = "\n".join(history_lines) if history_lines else "（暂无历史）"
-    
-    # 加载共享知识
-    shared_path = SHARED_DIR / "knowledge.json"
-    shared_text = ""
-    if shared_path.exists():
-        with open(shared_path, "r", encoding="utf-8") as f:
-            shared = json.load(f)
-        items = shared.get("items", [])[-10:]
+    def render(entry, items):
+        history_text = "\n".join(entry.history) if entry.history else "（暂无历史）"
+        shared_text = ""
         if items:
             shared_text = "\n".join([f"- {i.get('content')}" for i in items])
             shared_text = "\n\n## 共享知识库\n" + shared_text
-    
-    prompt = f"""你是{agent_name}，{role}。
+        
+        return f"""你是{agent_name}，{role}。
 {desc}
 
 ## 对话历史
@@ -125,7 +118,7 @@ def build_system_prompt(agent_name: str, config: dict) -> str:
 
 记住你是{agent_name}，用这个身份回复用户。现在用户对你说："""
     
-    return prompt
+    return PROMPT_CACHE.prompt(agent_name, (role, desc), render)
 
 def handle_command(message: str, config: dict) -> str:
     """处理管理命令"""
@@ -217,6 +210,7 @@ def handle_command(message: str, config: dict) -> str:
             
             with open(shared_path, "w", encoding="utf-8") as f:
                 json.dump(shared, f, ensure_ascii=False, indent=2)
+            PROMPT_CACHE.shared_changed(shared["items"])
             
             return "✅ 已添加到共享知识库"
         return "❌ 格式：共享 知识内容"
@@ -236,16 +230,21 @@ def handle_command(message: str, config: dict) -> str:
 def save_history(agent_name: str, role: str, content: str):
     """保存对话历史"""
     from datetime import datetime
+    # 读前读后 mtime 一致，才能确定读到的就是这个 mtime 对应的内容
+    loaded_mtime = file_mtime(get_memory_path(agent_name))
     memory = load_memory(agent_name)
-    memory.setdefault("history", []).append({
+    if file_mtime(get_memory_path(agent_name)) != loaded_mtime:
+        loaded_mtime = None
+    turn = {
         "role": role,
         "content": content,
         "timestamp": datetime.now().isoformat()
-    })
+    }
+    memory.setdefault("history", []).append(turn)
     # 限制长度
     if len(memory["history"]) > 100:
         memory["history"] = memory["history"][-100:]
-    save_memory(agent_name, memory)
+    save_memory(agent_name, memory, loaded_mtime, turn)
 
 def main():
     """CLI测试用"""
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+智能体元数据 memory/<编号>.meta.json
+历史条数、知识条数、最后更新时间、进行中的任务数、各日期的日程数，
+在写记忆/写任务时顺手更新，列表和仪表盘只读这个小文件，不用解析整个记忆。
+记忆文件的 mtime 也记在里面，记忆被别处写过（agent.py、手动编辑）时读的时候发现并重建
+"""
+
+import json
+import os
+from pathlib import Path
+
+SKILL_DIR = Path(__file__).parent
+MEMORY_DIR = SKILL_DIR / "memory"
+TASKS_FILE = SKILL_DIR / "tasks.json"
+
+def meta_path(agent_id):
+    return MEMORY_DIR / f"{agent_id.replace('/', '_')}.meta.json"
+
+def memory_file(agent_id):
+    return MEMORY_DIR / f"{agent_id.replace('/', '_')}.json"
+
+def _memory_mtime(agent_id):
+    try:
+        return memory_file(agent_id).stat().st_mtime_ns
+    except OSError:
+        return None
+
+def write_meta(agent_id, meta):
+    path = meta_path(agent_id)
+    path.parent.mkdir(exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def _read(agent_id):
+    path = meta_path(agent_id)
+    if path.exists():
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            pass
+    return None
+
+def memory_fields(mem, mtime=None):
+    """从记忆字典算出元数据里和记忆有关的字段，mtime 为对应记忆文件的 mtime"""
+    from knowledge_store import extract_dates
+    schedules = {}
+    for item in mem.get("knowledge", []):
+        if item.get("type") == "日程":
+            for d in extract_dates(item.get("content", "")):
+                schedules[d] = schedules.get(d, 0) + 1
+    return {
+        "history_count": len(mem.get("history", [])),
+        "summarized_count": mem.get("summary", {}).get("turns", 0),
+        "knowledge_count": len(mem.get("knowledge", [])),
+        "cold_count": mem.get("cold_count", 0),
+        "last_updated": mem.get("last_updated"),
+        "schedules": schedules,
+        "memory_mtime": mtime,
+    }
+
+def count_active(tasks):
+    """{编号: 进行中的任务数}，一次遍历"""
+    counts = {}
+    for t in tasks.values():
+        if t.get("status") == "进行中":
+            counts[t.get("agent_id")] = counts.get(t.get("agent_id"), 0) + 1
+    return counts
+
+def load_meta(agent_id):
+    """读元数据；还没有元数据文件的（旧数据），或记忆文件在别处被改过的，从记忆重建"""
+    meta = _read(agent_id)
+    mtime = _memory_mtime(agent_id)
+    if meta is not None and meta.get("memory_mtime") == mtime:
+        return meta
+    mem = {}
+    path = memory_file(agent_id)
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            mem = json.load(f)
+    if meta is None:
+        tasks = {}
+        if TASKS_FILE.exists():
+            with open(TASKS_FILE, "r", encoding="utf-8") as f:
+                tasks = json.load(f)
+        meta = {"active_tasks": count_active(tasks).get(agent_id, 0)}
+    meta.update(memory_fields(mem, mtime))
+    write_meta(agent_id, meta)
+    return meta
+
+def memory_saved(agent_id, mem):
+    """save_memory 之后调用"""
+    meta = _read(agent_id)
+    if meta is None:
+        # 还没有元数据文件（旧数据第一次保存）：load_meta 会连同任务数一起建好
+        load_meta(agent_id)
+        return
+    meta.update(memory_fields(mem, _memory_mtime(agent_id)))
+    write_meta(agent_id, meta)
+
+def tasks_saved(tasks):
+    """任务文件写入之后调用：只改进行中任务数有变化的智能体"""
+    counts = count_active(tasks)
+    for agent_id in {t.get("agent_id") for t in tasks.values() if t.get("agent_id")}:
+        meta = _read(agent_id)
+        if meta is None:
+            load_meta(agent_id)
+            continue
+        if meta.get("active_tasks", 0) != counts.get(agent_id, 0):
+            meta["active_tasks"] = counts.get(agent_id, 0)
+            write_meta(agent_id, meta)
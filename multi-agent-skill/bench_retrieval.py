@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+知识检索基准测试
+随机生成 N 条知识（默认 5 万条），测建索引时间和单次检索延迟
+用法: python3 bench_retrieval.py [-n 条数] [-q 查询次数]
+"""
+
+import argparse
+import random
+import time
+
+from knowledge_retrieval import TfidfIndex
+
+WORDS = [
+    "幼儿园", "家长会", "体检", "春游", "毕业典礼", "运动会", "报名", "缴费", "疫苗", "视力筛查",
+    "会议", "出差", "机票", "酒店", "报销", "周报", "需求评审", "上线", "版本", "服务器",
+    "主图", "文案", "视频", "直播", "店铺", "优惠券", "退款", "物流", "库存", "评价",
+    "股票", "基金", "分红", "房贷", "保险", "信用卡", "账单", "工资", "预算", "理财",
+    "生日", "聚餐", "礼物", "电影", "旅游", "签证", "护照", "天气", "快递", "维修",
+]
+FILLERS = ["记得", "下周", "明天上午", "每月", "提前", "需要", "安排", "注意", "确认", "准备好"]
+
+def make_item(rng):
+    words = rng.sample(WORDS, rng.randint(2, 5))
+    parts = []
+    for w in words:
+        parts.append(rng.choice(FILLERS) + w)
+    return "，".join(parts) + f"（{rng.randint(1, 28)}日）"
+
+def main():
+    parser = argparse.ArgumentParser(description="知识检索基准测试")
+    parser.add_argument("-n", type=int, default=50000, help="知识条数")
+    parser.add_argument("-q", type=int, default=200, help="查询次数")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    texts = [make_item(rng) for _ in range(args.n)]
+    queries = ["".join(rng.sample(WORDS, 2)) + "怎么安排" for _ in range(args.q)]
+
+    start = time.perf_counter()
+    index = TfidfIndex(texts)
+    build = time.perf_counter() - start
+    print(f"{args.n} 条知识，{len(index.vocab)} 个 n-gram，建索引 {build:.2f}s")
+
+    index.top(queries[0])  # 预热
+    times = []
+    for q in queries:
+        start = time.perf_counter()
+        index.top(q, k=5)
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    print(f"检索 {args.q} 次：平均 {sum(times) / len(times):.2f}ms，"
+          f"p50 {times[len(times) // 2]:.2f}ms，p95 {times[int(len(times) * 0.95)]:.2f}ms")
+    print("示例:", queries[0], "->", [texts[i] for i, _ in index.top(queries[0], k=3)])
+
+if __name__ == "__main__":
+    main()
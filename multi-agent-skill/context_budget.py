@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+按 token 预算拼装 prompt
+估算各部分 token 数，按模型给定的预算在人格、对话历史、知识之间分配，
+超长的历史截断、超长的知识只保留和任务相关的行，最后报告总 token 数
+"""
+
+import re
+from functools import lru_cache
+
+from ngram_index import tokenize
+
+# 各模型 prompt 的 token 预算（不含回复），按模型名或名字前缀匹配
+MODEL_BUDGETS = {
+    "qwen:0.5b": 1200,
+    "qwen2:0.5b": 1200,
+    "phi:0.5b": 1200,
+    "gemma:0.5b": 1200,
+    "minimax-portal": 6000,
+}
+DEFAULT_BUDGET = 2500
+KNOWLEDGE_SHARE = 0.5       # 有任务时知识最多占可分配预算的一半，没用完的留给历史
+MAX_ITEM_SHARE = 0.6        # 单条知识最多占知识预算的比例
+
+CJK_RE = re.compile(r"[⺀-鿿豈-﫿＀-￯]")
+
+@lru_cache(maxsize=4096)
+def estimate_tokens(text):
+    """粗略估算：中文和全角字符每字约 1 token，其余约 4 字符 1 token"""
+    if not text:
+        return 0
+    cjk = len(CJK_RE.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+def model_budget(model):
+    if not model:
+        return DEFAULT_BUDGET
+    if model in MODEL_BUDGETS:
+        return MODEL_BUDGETS[model]
+    for prefix in (model.split("/")[0], model.split(":")[0]):
+        if prefix in MODEL_BUDGETS:
+            return MODEL_BUDGETS[prefix]
+    return DEFAULT_BUDGET
+
+def truncate(text, max_tokens):
+    """保留开头，超出部分用省略标记代替"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    out = []
+    used = 0
+    for ch in text:
+        used += 1 if CJK_RE.match(ch) else 0.25
+        if used > max_tokens - 8:
+            break
+        out.append(ch)
+    return "".join(out).rstrip() + f"…（已截断，原文{len(text)}字）"
+
+def shrink(text, max_tokens, query=None):
+    """超长文本的摘要：按行挑选和 query 重合最多的行，保持原顺序；
+    没有 query 或都不相关时保留开头几行
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    lines = [l for l in text.splitlines() if l.strip()]
+    grams = set(tokenize(query)) if query else set()
+    hits = [len(grams & set(tokenize(line))) for line in lines] if grams else []
+    if any(hits):
+        order = sorted((i for i in range(len(lines)) if hits[i]), key=lambda i: (-hits[i], i))
+    else:
+        order = list(range(len(lines)))
+
+    # 每行所属的小标题（以冒号结尾的行，如「4月：」），选中一行时连同小标题一起保留
+    header, current = [], None
+    for i, line in enumerate(lines):
+        header.append(current)
+        if line.rstrip().endswith(("：", ":")):
+            current = i
+
+    # 第一行通常是标题，优先保留
+    keep = {0} if lines else set()
+    used = estimate_tokens(lines[0]) if lines else 0
+    for i in order:
+        need = [j for j in (header[i], i) if j is not None and j not in keep]
+        cost = sum(estimate_tokens(lines[j]) + 1 for j in need)
+        if used + cost > max_tokens - 10:
+            continue
+        keep.update(need)
+        used += cost
+    picked = "\n".join(lines[i] for i in sorted(keep))
+    return truncate(picked, max_tokens - 10) + f"\n…（节选，原文{len(lines)}行）"
+
+def assemble(head, history, knowledge, tail, model=None, task=None, knowledge_title="相关知识"):
+    """head/tail: 人格部分（不裁剪）；history: 已格式化的对话行（旧 -> 新）；
+    knowledge: 知识条目列表（按相关度排序）
+    返回 (prompt, 统计)，统计里的 tokens 是最终 prompt 的估算 token 数
+    """
+    budget = model_budget(model)
+    fixed = estimate_tokens(head) + estimate_tokens(tail) + estimate_tokens(task or "")
+    available = max(0, budget - fixed)
+    stats = {"model": model, "budget": budget, "persona": fixed, "truncated": 0}
+
+    # 知识：按相关度顺序放入，单条超长的做摘要
+    knowledge_budget = int(available * KNOWLEDGE_SHARE) if history else available
+    item_cap = max(64, int(knowledge_budget * MAX_ITEM_SHARE))
+    lines, used = [], 0
+    for item in knowledge:
+        content = item.get("content", "")
+        if estimate_tokens(content) > item_cap:
+            content = shrink(content, item_cap, task)
+            stats["truncated"] += 1
+        cost = estimate_tokens(content) + 2
+        if used + cost > knowledge_budget:
+            continue
+        lines.append(f"- {content}")
+        used += cost
+    stats["knowledge"] = used
+    stats["knowledge_items"] = len(lines)
+
+    # 历史：从最新的一轮往前放，剩下的预算都给历史
+    history_budget = available - used
+    kept, hist_used = [], 0
+    for line in reversed(history):
+        cost = estimate_tokens(line) + 1
+        if hist_used + cost > history_budget:
+            if not kept and history_budget > 32:
+                # 最近一轮本身就超长，截断后保留
+                line = truncate(line, history_budget - 1)
+                kept.append(line)
+                hist_used += estimate_tokens(line) + 1
+                stats["truncated"] += 1
+            break
+        kept.append(line)
+        hist_used += cost
+    kept.reverse()
+    stats["history"] = hist_used
+    stats["history_turns"] = len(kept)
+    stats["dropped_turns"] = len(history) - len(kept)
+
+    hist_text = "\n".join(kept) or "（暂无历史）"
+    knowledge_text = f"\n\n## {knowledge_title}\n" + "\n".join(lines) if lines else ""
+    prompt = head + hist_text + "\n" + knowledge_text + tail
+    stats["tokens"] = estimate_tokens(prompt)
+    return prompt, stats
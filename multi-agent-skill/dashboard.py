@@ -38,6 +38,12 @@ def load_memory(agent_id):
             return json.load(f)
     return {"history": [], "knowledge": []}
 
+def save_tasks(tasks):
+    with open(TASKS_FILE, "w", encoding="utf-8") as f:
+        json.dump(tasks, f, ensure_ascii=False, indent=2)
+    from agent_meta import tasks_saved
+    tasks_saved(tasks)
+
 def get_system_info():
     """获取系统资源"""
     # CPU
@@ -90,12 +96,14 @@ def api_data():
     tasks = load_tasks()
     now = datetime.now()
     
-    # 智能体数据
+    # 智能体数据（只读元数据小文件）
+    from agent_meta import load_meta
     agents = []
+    metas = {}
     total_memories = 0
     for agent_id, info in config.get("agents", {}).items():
-        mem = load_memory(agent_id)
-        history_count = len(mem.get("history", []))
+        metas[agent_id] = load_meta(agent_id)
+        history_count = metas[agent_id].get("history_count", 0)
         total_memories += history_count
         
         agents.append({
@@ -129,13 +137,13 @@ def api_data():
         else:
             history_tasks.append(task_data)
     
-    # 今日日程
+    # 今日日程：热数据的按日期计数在元数据里，冷数据只打开索引里含今天日期的段
+    from knowledge_store import schedules
+    today = now.date().isoformat()
     today_schedules = 0
-    for agent_id in config.get("agents", {}):
-        mem = load_memory(agent_id)
-        for item in mem.get("knowledge", []):
-            if item.get("type") == "日程" and str(now.date()) in item.get("content", ""):
-                today_schedules += 1
+    for agent_id, meta in metas.items():
+        today_schedules += meta.get("schedules", {}).get(today, 0)
+        today_schedules += len(schedules(agent_id, {}, on=today))
     
     return jsonify({
         "agents": agents,
@@ -175,8 +183,7 @@ def api_task():
         "note": "等待执行"
     }
     
-    with open(TASKS_FILE, "w", encoding="utf-8") as f:
-        json.dump(tasks, f, ensure_ascii=False, indent=2)
+    save_tasks(tasks)
     
     # 发送确认消息
     send_qq_message(f"✅ 主人，小风现在开始任务了哟～喵喵喵！\n\n任务内容：{task_content}\n\n分配给: {agent_id}")
@@ -200,8 +207,7 @@ def api_task_complete():
         agent = task.get("agent_id", "")
         content = task.get("content", "")
         
-        with open(TASKS_FILE, "w", encoding="utf-8") as f:
-            json.dump(tasks, f, ensure_ascii=False, indent=2)
+        save_tasks(tasks)
         
         # 发送完成消息
         msg = f"✅ 主人，任务已完成啦～喵喵喵！\n\n任务：{content}\n"
@@ -228,8 +234,7 @@ def api_task_cancel():
         task = tasks[task_id]
         content = task.get("content", "")
         
-        with open(TASKS_FILE, "w", encoding="utf-8") as f:
-            json.dump(tasks, f, ensure_ascii=False, indent=2)
+        save_tasks(tasks)
         
         # 发送取消消息
         send_qq_message(f"❌ 主人，任务已取消～\n\n任务：{content}")
@@ -246,6 +251,29 @@ def send_qq_message(message):
     except:
         pass
 
+@app.route('/api/images/search')
+def api_images_search():
+    """按图片里的文字搜索收到的图片"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "缺少参数"}), 400
+    limit = request.args.get('limit', 20, type=int)
+    
+    from image_index import search_images
+    return jsonify({"query": query, "results": search_images(query, limit)})
+
+@app.route('/api/search')
+def api_search():
+    """搜索所有智能体的对话历史和知识"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "缺少参数"}), 400
+    limit = request.args.get('limit', 20, type=int)
+    agent_id = request.args.get('agent') or None
+    
+    from memory_search import search_memory
+    return jsonify({"query": query, "results": search_memory(query, limit, agent_id)})
+
 @app.route('/api/agents')
 def api_agents():
     """智能体列表"""
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+收到图片的全文索引
+对 received_images 里的新图片做 OCR（ocr_image），文字写入 n-gram 倒排索引，
+按关键词找回图片，如「幼儿园 通知」
+
+用法: python3 image_index.py update          # 增量索引新图片
+      python3 image_index.py search 幼儿园通知  # 查询
+"""
+
+import sys
+from pathlib import Path
+
+from ngram_index import NgramIndex, load_cached, make_snippet
+
+IMAGES_DIR = Path.home() / "openclaw_workspace" / "received_images"
+INDEX_FILE = IMAGES_DIR / "ocr_index.json"
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
+BATCH_SIZE = 20     # 每 OCR 这么多张保存一次索引，中断后不用从头再来
+
+def list_images():
+    """received_images 下所有图片（相对路径）"""
+    if not IMAGES_DIR.exists():
+        return []
+    return sorted(
+        str(p.relative_to(IMAGES_DIR)) for p in IMAGES_DIR.rglob("*")
+        if p.suffix.lower() in IMAGE_EXTS
+    )
+
+def update_index(workers=4, backend=None):
+    """增量索引：只 OCR 还没入索引的图片，已删除的图片移出索引"""
+    from ocr_image import ocr_batch
+
+    index = NgramIndex.load(INDEX_FILE)
+    images = list_images()
+    existing = set(images)
+    removed = [doc_id for doc_id in list(index.docs) if doc_id not in existing]
+    for doc_id in removed:
+        index.remove(doc_id)
+
+    pending = [rel for rel in images if rel not in index]
+    print(f"共 {len(images)} 张图片，待索引 {len(pending)} 张，移除 {len(removed)} 张")
+
+    added = failed = 0
+    for i in range(0, len(pending), BATCH_SIZE):
+        batch = pending[i:i + BATCH_SIZE]
+        results = ocr_batch([str(IMAGES_DIR / rel) for rel in batch], backend=backend, workers=workers)
+        for rel, r in zip(batch, results):
+            if r["success"]:
+                path = IMAGES_DIR / rel
+                index.add(rel, r["text"], {"name": path.name, "mtime": path.stat().st_mtime})
+                added += 1
+            else:
+                failed += 1
+        index.save()
+        print(f"  已处理 {min(i + BATCH_SIZE, len(pending))}/{len(pending)}")
+
+    if removed and not pending:
+        index.save()
+    return added, failed
+
+def search_images(query, limit=20):
+    """查询，返回按相关度排序的图片"""
+    index = load_cached(INDEX_FILE)
+    results = []
+    for doc_id, score in index.search(query, limit):
+        doc = index.docs[doc_id]
+        results.append({
+            "path": str(IMAGES_DIR / doc_id),
+            "name": doc["meta"].get("name", doc_id),
+            "score": round(score, 3),
+            "snippet": make_snippet(doc["text"], query),
+        })
+    return results
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("update", "search"):
+        print("用法: python3 image_index.py update | search <关键词>")
+        sys.exit(1)
+
+    if sys.argv[1] == "update":
+        added, failed = update_index()
+        print(f"✅ 新增 {added} 张，失败 {failed} 张")
+    else:
+        import time
+        query = " ".join(sys.argv[2:])
+        start = time.time()
+        results = search_images(query)
+        print(f"🔍 「{query}」找到 {len(results)} 张 ({(time.time() - start) * 1000:.1f}ms)")
+        for r in results:
+            print(f"• [{r['score']}] {r['path']}")
+            print(f"  {r['snippet']}")
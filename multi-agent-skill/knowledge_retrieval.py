@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+知识检索 - 给智能体 prompt 挑选和当前任务相关的知识
+字符 n-gram（与 ngram_index 相同的切分）TF-IDF，文档向量 L2 归一化后按 n-gram 列存
+（类似 CSC 稀疏矩阵），查询时只累加查询里出现的列，得到余弦相似度，取 top-k
+"""
+
+import math
+
+import numpy as np
+
+from ngram_index import tokenize
+
+class TfidfIndex:
+    def __init__(self, texts):
+        self.size = len(texts)
+        vocab = {}
+        doc_ids, cols, counts = [], [], []
+        for i, text in enumerate(texts):
+            tf = {}
+            for g in tokenize(text):
+                tf[g] = tf.get(g, 0) + 1
+            for g, c in tf.items():
+                doc_ids.append(i)
+                cols.append(vocab.setdefault(g, len(vocab)))
+                counts.append(c)
+        self.vocab = vocab
+        doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        cols = np.asarray(cols, dtype=np.int32)
+        counts = np.asarray(counts, dtype=np.float32)
+
+        # idf 和按文档 L2 归一化的 tf-idf 权重
+        df = np.bincount(cols, minlength=len(vocab))
+        self.idf = (np.log((1 + self.size) / (1 + df)) + 1).astype(np.float32)
+        weights = (1 + np.log(counts)) * self.idf[cols]
+        norms = np.sqrt(np.bincount(doc_ids, weights=weights * weights, minlength=self.size))
+        weights /= np.maximum(norms, 1e-9)[doc_ids]
+
+        # 按列排序：每个 n-gram 的倒排表是连续的一段
+        order = np.argsort(cols, kind="stable")
+        self.docs = doc_ids[order]
+        self.weights = weights[order].astype(np.float32)
+        self.indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        self.indptr[1:] = np.cumsum(df)
+
+    def scores(self, query):
+        """查询与每个文档的余弦相似度"""
+        tf = {}
+        for g in tokenize(query):
+            col = self.vocab.get(g)
+            if col is not None:
+                tf[col] = tf.get(col, 0) + 1
+        scores = np.zeros(self.size, dtype=np.float32)
+        if not tf:
+            return scores
+        q = {col: (1 + math.log(c)) * float(self.idf[col]) for col, c in tf.items()}
+        qnorm = math.sqrt(sum(w * w for w in q.values()))
+        for col, w in q.items():
+            start, end = self.indptr[col], self.indptr[col + 1]
+            # 同一列里文档不重复，可以直接花式索引累加
+            scores[self.docs[start:end]] += self.weights[start:end] * (w / qnorm)
+        return scores
+
+    def top(self, query, k=5):
+        """[(下标, 分数), ...]，只返回分数大于 0 的"""
+        if not self.size:
+            return []
+        scores = self.scores(query)
+        k = min(k, self.size)
+        idx = np.argpartition(-scores, k - 1)[:k]
+        idx = idx[np.argsort(-scores[idx])]
+        return [(int(i), float(scores[i])) for i in idx if scores[i] > 0]
+
+# 知识列表没变时复用已建好的索引
+_INDEXES = {}
+
+def get_index(name, items):
+    """name: 索引名（如 "shared"、智能体编号）；items 是同一个列表对象且长度未变时直接复用"""
+    cached = _INDEXES.get(name)
+    if cached and cached[0] is items and cached[1] == len(items):
+        return cached[2]
+    index = TfidfIndex([i.get("content", "") for i in items])
+    _INDEXES[name] = (items, len(items), index)
+    return index
+
+def retrieve(query, sources, k=5, max_chars=1200):
+    """sources: [(索引名, 知识列表), ...]
+    各来源取 top-k 后按分数合并，在 max_chars 预算内依次放入，返回知识条目列表
+    """
+    ranked = []
+    for name, items in sources:
+        if not items:
+            continue
+        for i, score in get_index(name, items).top(query, k):
+            ranked.append((score, items[i]))
+    ranked.sort(key=lambda x: x[0], reverse=True)
+
+    selected, used = [], 0
+    for score, item in ranked:
+        size = len(item.get("content", ""))
+        if used + size > max_chars:
+            continue
+        selected.append(item)
+        used += size
+        if len(selected) >= k:
+            break
+    return selected
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+知识冷热分层
+memory/<编号>.json 里只保留热数据（最近的、重要的、还没过的日程），
+其余的按批归档成压缩段 memory/<编号>.cold/seg-0001.json.gz，
+段的类型、标签、日程日期记在 index.json 里，查询（如某天的日程）只打开相关的段
+
+用法: python3 knowledge_store.py archive [编号]   # 手动归档
+      python3 knowledge_store.py stats [编号]
+"""
+
+import gzip
+import json
+import os
+import re
+import threading
+from datetime import date, datetime
+from pathlib import Path
+
+SKILL_DIR = Path(__file__).parent
+MEMORY_DIR = SKILL_DIR / "memory"
+
+HOT_MAX = 50            # 归档后热数据保留的条数
+ARCHIVE_AT = 100        # 热数据超过这么多条时自动归档
+SEGMENT_SIZE = 200      # 每个冷段最多条数
+KEEP_TAGS = {"重要"}    # 带这些标签的不归档
+
+CN_DATE_RE = re.compile(r"(\d{4})年(\d{1,2})月(\d{1,2})日")
+ISO_DATE_RE = re.compile(r"(\d{4})-(\d{1,2})-(\d{1,2})")
+
+def cold_dir(agent_id):
+    return MEMORY_DIR / f"{agent_id.replace('/', '_')}.cold"
+
+def extract_dates(text):
+    """内容里出现的日期（2026年2月27日 / 2026-02-27），返回 ISO 字符串集合"""
+    dates = set()
+    for m in list(CN_DATE_RE.finditer(text)) + list(ISO_DATE_RE.finditer(text)):
+        try:
+            dates.add(date(int(m.group(1)), int(m.group(2)), int(m.group(3))).isoformat())
+        except ValueError:
+            pass
+    return dates
+
+def is_hot(item, today):
+    """还没过的日程、重要的条目留在热数据里"""
+    if KEEP_TAGS & set(item.get("tags", [])):
+        return True
+    if item.get("type") == "日程":
+        return any(d >= today for d in extract_dates(item.get("content", "")))
+    return False
+
+# ========== 索引和段 ==========
+
+def load_index(agent_id):
+    path = cold_dir(agent_id) / "index.json"
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"segments": []}
+
+def _write_json_atomic(path, data, compress=False):
+    tmp = path.with_name(path.name + ".tmp")
+    opener = gzip.open if compress else open
+    with opener(tmp, "wt", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+# 解压后的段按 (路径, mtime) 缓存
+_SEGMENTS = {}
+_SEGMENTS_LOCK = threading.Lock()
+SEGMENT_CACHE = 16
+
+def load_segment(agent_id, name):
+    path = cold_dir(agent_id) / name
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return []
+    with _SEGMENTS_LOCK:
+        cached = _SEGMENTS.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        items = json.load(f)
+    with _SEGMENTS_LOCK:
+        if len(_SEGMENTS) >= SEGMENT_CACHE:
+            _SEGMENTS.pop(next(iter(_SEGMENTS)))
+        _SEGMENTS[path] = (mtime, items)
+    return items
+
+# 全部冷数据按 index.json 的 mtime 缓存成同一个列表对象，
+# 按任务检索（knowledge_retrieval.get_index 按列表对象复用索引）和归档查重都用它
+_COLD = {}
+
+def cold_items(agent_id):
+    path = cold_dir(agent_id) / "index.json"
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return []
+    with _SEGMENTS_LOCK:
+        cached = _COLD.get(agent_id)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    items = list(iter_cold(agent_id))
+    with _SEGMENTS_LOCK:
+        _COLD[agent_id] = (mtime, items)
+    return items
+
+def _item_key(item):
+    return (item.get("type"), item.get("content"), item.get("added_at"))
+
+def _describe(name, items):
+    types, tags, dates = set(), set(), set()
+    for item in items:
+        if item.get("type"):
+            types.add(item["type"])
+        tags.update(item.get("tags", []))
+        if item.get("type") == "日程":
+            dates.update(extract_dates(item.get("content", "")))
+    added = sorted(i.get("added_at") or "" for i in items)
+    return {
+        "file": name,
+        "count": len(items),
+        "types": sorted(types),
+        "tags": sorted(tags),
+        "dates": sorted(dates),
+        "added": [added[0], added[-1]] if added else ["", ""],
+    }
+
+def archive(agent_id, mem, hot_max=HOT_MAX):
+    """把 mem["knowledge"] 里超出 hot_max 的冷数据归档（原地修改 mem），返回移出热数据的条数
+    调用方负责随后保存 mem；段先写、记忆文件后写，中间崩溃的话热数据里还留着已归档的条目，
+    下次归档时发现已经在冷数据里的只从热数据移走，不会重复归档
+    """
+    knowledge = mem.get("knowledge", [])
+    today = date.today().isoformat()
+    hot, candidates = [], []
+    for item in knowledge:
+        (hot if is_hot(item, today) else candidates).append(item)
+    # 候选按添加时间，最新的优先留在热数据里
+    candidates.sort(key=lambda i: i.get("added_at") or "")
+    keep = max(0, hot_max - len(hot))
+    cold = candidates[:max(0, len(candidates) - keep)]
+    if not cold:
+        return 0
+
+    # 已经在冷数据里的（上次归档后没来得及保存记忆文件）只从热数据移走
+    archived = {_item_key(i) for i in cold_items(agent_id)}
+    pending = [i for i in cold if _item_key(i) not in archived]
+    index = load_index(agent_id)
+    segments = index["segments"]
+    if pending:
+        directory = cold_dir(agent_id)
+        directory.mkdir(parents=True, exist_ok=True)
+        # 先填满最后一个段，再开新段
+        if segments and segments[-1]["count"] < SEGMENT_SIZE:
+            last = segments.pop()
+            items = load_segment(agent_id, last["file"]) + pending[:SEGMENT_SIZE - last["count"]]
+            pending = pending[SEGMENT_SIZE - last["count"]:]
+            _write_json_atomic(directory / last["file"], items, compress=True)
+            segments.append(_describe(last["file"], items))
+        while pending:
+            items, pending = pending[:SEGMENT_SIZE], pending[SEGMENT_SIZE:]
+            name = f"seg-{len(segments) + 1:04d}.json.gz"
+            _write_json_atomic(directory / name, items, compress=True)
+            segments.append(_describe(name, items))
+        index["updated_at"] = datetime.now().isoformat()
+        _write_json_atomic(directory / "index.json", index)
+
+    cold_ids = {id(i) for i in cold}
+    mem["knowledge"] = [i for i in knowledge if id(i) not in cold_ids]
+    mem["cold_count"] = sum(s["count"] for s in segments)
+    return len(cold)
+
+# ========== 查询 ==========
+
+def iter_cold(agent_id, types=None, tags=None, dates=None, since=None):
+    """只打开索引显示可能命中的段
+    types/tags: 条目类型/标签集合；dates: ISO 日期集合；since: 含不早于该日期的日程
+    """
+    for seg in load_index(agent_id)["segments"]:
+        if types and not set(types) & set(seg["types"]):
+            continue
+        if tags and not set(tags) & set(seg["tags"]):
+            continue
+        if dates and not set(dates) & set(seg["dates"]):
+            continue
+        if since and not (seg["dates"] and seg["dates"][-1] >= since):
+            continue
+        yield from load_segment(agent_id, seg["file"])
+
+def all_knowledge(agent_id, mem):
+    """热数据 + 全部冷数据"""
+    return list(mem.get("knowledge", [])) + list(iter_cold(agent_id))
+
+def schedules(agent_id, mem, on=None, since=None):
+    """日程条目：on 为某一天，since 为某天及以后（ISO 日期字符串）"""
+    wanted = {on} if on else None
+    result = []
+    for item in list(mem.get("knowledge", [])) + list(iter_cold(agent_id, types=["日程"], dates=wanted, since=since)):
+        if item.get("type") != "日程":
+            continue
+        found = extract_dates(item.get("content", ""))
+        if on and on not in found:
+            continue
+        if since and not any(d >= since for d in found):
+            continue
+        result.append(item)
+    return result
+
+if __name__ == "__main__":
+    import sys
+    from scheduler import load_config, load_memory, save_memory
+
+    if len(sys.argv) < 2 or sys.argv[1] not in ("archive", "stats"):
+        print("用法: python3 knowledge_store.py archive|stats [编号]")
+        sys.exit(1)
+    agent_ids = sys.argv[2:] or list(load_config().get("agents", {}))
+    for agent_id in agent_ids:
+        mem = load_memory(agent_id)
+        if sys.argv[1] == "archive":
+            moved = archive(agent_id, mem)
+            if moved:
+                save_memory(agent_id, mem)
+            print(f"{agent_id}: 归档 {moved} 条，热数据 {len(mem.get('knowledge', []))} 条")
+        else:
+            segs = load_index(agent_id)["segments"]
+            print(f"{agent_id}: 热数据 {len(mem.get('knowledge', []))} 条，冷数据 {sum(s['count'] for s in segs)} 条 / {len(segs)} 段")
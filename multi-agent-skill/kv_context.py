@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+智能体的 Ollama 对话上下文复用
+/api/generate 返回的 context 是这次对话（system + 历史 + 本轮）的 token 序列，
+下次带上它，模型只需评估新的一轮，人格 + 知识 + 历史这段前缀不用每次重新算。
+
+每个智能体一份 memory/<编号>.context.json：{key, model, mtime, context}
+- key: 人格配置、共享知识的摘要，改了配置或共享知识就重新开始
+- mtime: 上次生成后记忆文件的 mtime，记忆被别处写过（知识、摘要、别的入口追加的对话）就重新开始
+- 每次调用都带上 num_ctx（模型预算的 NUM_CTX_FACTOR 倍 + 回复预留），Ollama 默认的 2048 窗口放不下较大的预算；
+  context + 本轮 prompt + 回复预留超过 num_ctx 时重新开始，免得人格前缀被 Ollama 挤出窗口
+
+环境变量 AGENT_CONTEXT=0 关闭复用（对比用）
+
+用法: python3 kv_context.py stats           # 对比复用/未复用上下文时的 prompt 评估耗时
+      python3 kv_context.py clear [编号]
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+SKILL_DIR = Path(__file__).parent
+MEMORY_DIR = SKILL_DIR / "memory"
+GENERATION_LOG = MEMORY_DIR / "generation_stats.jsonl"
+
+ENABLED = os.environ.get("AGENT_CONTEXT", "1") != "0"
+NUM_CTX_FACTOR = 2     # 窗口 = 预算的这么多倍 + 回复预留：新对话用掉一份预算，另一份留给后续轮次
+REPLY_TOKENS = 512     # 给回复预留的 token
+KEEP_ALIVE = "30m"      # 模型留在内存里，KV 缓存才不会丢
+
+def context_path(agent_id):
+    return MEMORY_DIR / f"{agent_id.replace('/', '_')}.context.json"
+
+def prefix_key(model, head, tail, knowledge):
+    """人格部分和放进前缀的知识 -> 摘要"""
+    h = hashlib.sha1()
+    for part in [model, head, tail] + [item.get("content", "") for item in knowledge]:
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+# 同一个智能体的调用串行：context 是一条对话链，并发调用会各自接在同一个点上
+_LOCKS = {}
+_LOCKS_LOCK = threading.Lock()
+
+def agent_lock(agent_id):
+    with _LOCKS_LOCK:
+        return _LOCKS.setdefault(agent_id, threading.Lock())
+
+def num_ctx(model):
+    """传给 Ollama 的上下文窗口；同一模型要保持不变，变了 Ollama 会重新加载模型"""
+    from context_budget import model_budget
+    return model_budget(model) * NUM_CTX_FACTOR + REPLY_TOKENS
+
+def load_context(agent_id, key, model, mtime, prompt_tokens=0):
+    """还能接着用的 context，不能用返回 None
+    prompt_tokens: 本轮 prompt 的估算 token 数，加上它和回复预留后要放得进 num_ctx
+    """
+    path = context_path(agent_id)
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception:
+        return None
+    if data.get("key") != key or data.get("model") != model or data.get("mtime") != mtime:
+        return None
+    context = data.get("context") or None
+    if context and len(context) + prompt_tokens + REPLY_TOKENS > num_ctx(model):
+        return None
+    return context
+
+def save_context(agent_id, key, model, mtime, context):
+    path = context_path(agent_id)
+    path.parent.mkdir(exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"key": key, "model": model, "mtime": mtime, "context": context,
+                   "updated_at": datetime.now().isoformat()}, f)
+    os.replace(tmp, path)
+
+def clear_context(agent_id):
+    try:
+        context_path(agent_id).unlink()
+    except FileNotFoundError:
+        pass
+
+def stats(log_path=GENERATION_LOG):
+    """按是否复用了 context 汇总 generation_stats.jsonl 里的 prompt 评估耗时"""
+    groups = {}
+    if not log_path.exists():
+        return groups
+    with open(log_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                r = json.loads(line)
+            except ValueError:
+                continue
+            if r.get("error"):
+                continue
+            g = groups.setdefault("复用" if r.get("context_reused") else "未复用", {"calls": 0, "prompt_eval_ms": 0, "prompt_eval_count": 0})
+            g["calls"] += 1
+            g["prompt_eval_ms"] += r.get("prompt_eval_ms") or 0
+            g["prompt_eval_count"] += r.get("prompt_eval_count") or 0
+    return groups
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) < 2 or sys.argv[1] not in ("stats", "clear"):
+        print("用法: python3 kv_context.py stats | clear [编号]")
+        sys.exit(1)
+    if sys.argv[1] == "stats":
+        groups = stats()
+        if not groups:
+            print("还没有生成记录")
+        for name, g in groups.items():
+            print(f"{name}: {g['calls']} 次，平均 prompt 评估 {g['prompt_eval_ms'] / g['calls']:.0f}ms / "
+                  f"{g['prompt_eval_count'] / g['calls']:.0f} tokens")
+    else:
+        from scheduler import load_config
+        for agent_id in sys.argv[2:] or list(load_config().get("agents", {})):
+            clear_context(agent_id)
+        print("✅ 已清除")
@@ -2,11 +2,17 @@
 """
 QQ机器人图片监听器
 监听接收到的图片并自动保存
+- 优先用 inotify 事件驱动（需要 inotify_simple），否则退回轮询
+- 按内容哈希去重，每张图片只处理一次
+- 按哈希分目录存放，支持 reflink 的文件系统上用 reflink 代替复制
+  （不用硬链接：来源文件被原地改写时存储的对象会跟着变）
 """
 
 import os
 import json
 import time
+import shutil
+import hashlib
 import subprocess
 from pathlib import Path
 from datetime import datetime
@@ -15,6 +21,18 @@ from datetime import datetime
 QQBOT_DIR = Path.home() / ".openclaw" / "extensions" / "qqbot"
 SAVE_DIR = Path.home() / "openclaw_workspace" / "received_images"
 SAVE_DIR.mkdir(parents=True, exist_ok=True)
+OBJECTS_DIR = SAVE_DIR / "objects"          # 内容寻址存储: objects/ab/abcdef....jpg
+INDEX_FILE = SAVE_DIR / "index.json"        # 哈希索引
+
+CACHE_DIRS = [
+    QQBOT_DIR / "data",
+    QQBOT_DIR / "cache",
+    QQBOT_DIR / "runtime",
+]
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
+POLL_INTERVAL = 10      # 轮询间隔（秒）
+RESCAN_INTERVAL = 300   # inotify 模式下补扫的间隔（秒），防止漏掉事件、发现后来才建的缓存目录
+FICLONE = 0x40049409    # Linux reflink ioctl
 
 print(f"📁 图片保存目录: {SAVE_DIR}")
 print("🪐 开始监听图片消息...")
@@ -38,44 +56,213 @@ def download_image(image_url, filename):
         print(f"❌ 错误: {e}")
         return False
 
-def check_for_images():
-    """检查是否有新图片"""
-    # 检查qqbot的缓存目录
-    cache_dirs = [
-        QQBOT_DIR / "data",
-        QQBOT_DIR / "cache",
-        QQBOT_DIR / "runtime",
-    ]
-    
-    for cache_dir in cache_dirs:
-        if not cache_dir.exists():
-            continue
-        
-        # 查找图片文件
-        for ext in ["*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp"]:
-            for img_file in cache_dir.rglob(ext):
-                # 检查是否是最近创建的（1小时内）
-                if time.time() - img_file.stat().st_mtime < 3600:
-                    print(f"🖼️ 发现图片: {img_file.name}")
-                    
-                    # 复制到保存目录
-                    new_name = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{img_file.name}"
-                    try:
-                        import shutil
-                        shutil.copy2(img_file, SAVE_DIR / new_name)
-                        print(f"✅ 已保存: {new_name}")
-                    except Exception as e:
-                        print(f"❌ 保存失败: {e}")
+# ========== 哈希索引 ==========
 
-def main():
-    """主循环"""
+def load_index():
+    """索引结构:
+    images: {sha256: {"path": 存储路径, "name": 原文件名, "source": 来源路径, "saved_at": 时间}}
+    sources: {来源路径: [size, mtime, sha256]}  —— 来源文件没变就不用再算哈希
+    """
+    if INDEX_FILE.exists():
+        with open(INDEX_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"images": {}, "sources": {}}
+
+def save_index(index):
+    tmp = INDEX_FILE.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, INDEX_FILE)
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def store_object(src, dst, digest):
+    """把 src 存成对象 dst：reflink > 复制
+    先写到临时文件，核对哈希后再 os.replace 到位，不直接写 dst；
+    dst 已存在且内容正确时（上次保存后没来得及写索引、索引丢了）直接复用
+    """
+    # 旧版本留下的硬链接对象（st_nlink > 1）重新复制一份，和来源断开
+    if dst.exists() and dst.stat().st_nlink == 1 and file_hash(dst) == digest:
+        return "已存在"
+    tmp = dst.with_name(dst.name + ".tmp")
+    try:
+        try:
+            import fcntl
+            with open(src, "rb") as fs, open(tmp, "wb") as fd:
+                fcntl.ioctl(fd.fileno(), FICLONE, fs.fileno())
+            shutil.copystat(src, tmp)
+            method = "reflink"
+        except OSError:
+            shutil.copy2(src, tmp)
+            method = "复制"
+        if file_hash(tmp) != digest:
+            raise OSError("复制期间来源文件被改写")
+        os.replace(tmp, dst)
+        return method
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+def process_image(img_file, index):
+    """处理一张图片，返回是否新增"""
+    try:
+        stat = img_file.stat()
+    except FileNotFoundError:
+        return False
+    source = str(img_file)
+    known = index["sources"].get(source)
+    if known and known[0] == stat.st_size and known[1] == stat.st_mtime:
+        return False
+
+    try:
+        digest = file_hash(img_file)
+    except FileNotFoundError:
+        # stat 之后被删掉了（缓存目录里的临时文件）
+        return False
+    index["sources"][source] = [stat.st_size, stat.st_mtime, digest]
+    if digest in index["images"]:
+        return False
+
+    target = OBJECTS_DIR / digest[:2] / f"{digest}{img_file.suffix.lower()}"
+    target.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        method = store_object(img_file, target, digest)
+    except Exception as e:
+        print(f"❌ 保存失败: {e}")
+        return False
+
+    index["images"][digest] = {
+        "path": str(target.relative_to(SAVE_DIR)),
+        "name": img_file.name,
+        "source": source,
+        "saved_at": datetime.now().isoformat(),
+    }
+    print(f"✅ 已保存({method}): {img_file.name} -> {target.name}")
+    return True
+
+def is_image(path):
+    return path.suffix.lower() in IMAGE_EXTS
+
+# ========== 轮询模式 ==========
+
+def check_dir(directory, index):
+    """扫描一个目录，返回新增数量"""
+    added = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = Path(root) / name
+            if is_image(path) and process_image(path, index):
+                added += 1
+    return added
+
+def check_for_images(index):
+    """扫描一遍缓存目录，返回新增数量"""
+    return sum(check_dir(d, index) for d in CACHE_DIRS if d.exists())
+
+def poll_loop(index):
     while True:
         try:
-            check_for_images()
+            if check_for_images(index):
+                save_index(index)
         except Exception as e:
             print(f"❌ 监听错误: {e}")
-        
-        time.sleep(10)  # 每10秒检查一次
+
+        time.sleep(POLL_INTERVAL)  # 每10秒检查一次
+
+# ========== inotify 模式 ==========
+
+def watch_loop(index):
+    """inotify 事件驱动，新建的子目录自动加入监听
+    QQBOT_DIR 本身也监听（不递归），启动后才建的缓存目录一出现就加入；
+    另外每 RESCAN_INTERVAL 秒补扫一遍
+    """
+    from inotify_simple import INotify, flags
+    inotify = INotify()
+    mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE
+    watches = {}
+    watched_roots = set()
+
+    def add_watch(directory):
+        for root, dirs, _ in os.walk(directory):
+            try:
+                watches[inotify.add_watch(root, mask)] = Path(root)
+            except OSError:
+                pass
+
+    def watch_cache_dirs(scan=True):
+        """加入还没监听的缓存目录，返回补扫新增数量"""
+        added = 0
+        for cache_dir in CACHE_DIRS:
+            if cache_dir.exists() and cache_dir not in watched_roots:
+                watched_roots.add(cache_dir)
+                add_watch(cache_dir)
+                if scan:
+                    added += check_dir(cache_dir, index)
+        return added
+
+    try:
+        watches[inotify.add_watch(QQBOT_DIR, flags.CREATE | flags.MOVED_TO)] = QQBOT_DIR
+    except OSError:
+        pass
+    watch_cache_dirs(scan=False)  # 启动时 main 已经扫过
+    last_rescan = time.time()
+
+    while True:
+        added = 0
+        for event in inotify.read(timeout=RESCAN_INTERVAL * 1000):
+            try:
+                directory = watches.get(event.wd)
+                if directory is None or not event.name:
+                    continue
+                path = directory / event.name
+                if directory == QQBOT_DIR:
+                    if path in CACHE_DIRS:
+                        added += watch_cache_dirs()
+                elif event.mask & flags.ISDIR:
+                    if event.mask & flags.CREATE:
+                        add_watch(path)
+                        # 新目录可能在加入监听前就写入了文件，补扫一遍
+                        added += check_dir(path, index)
+                elif event.mask & (flags.CLOSE_WRITE | flags.MOVED_TO) and is_image(path):
+                    if process_image(path, index):
+                        added += 1
+            except Exception as e:
+                print(f"❌ 监听错误: {event.name}: {e}")
+        if time.time() - last_rescan >= RESCAN_INTERVAL:
+            last_rescan = time.time()
+            try:
+                added += watch_cache_dirs() + check_for_images(index)
+            except Exception as e:
+                print(f"❌ 补扫错误: {e}")
+        if added:
+            save_index(index)
+
+def main():
+    """主循环"""
+    index = load_index()
+    # 启动时补扫一遍，处理离线期间收到的图片
+    if check_for_images(index):
+        save_index(index)
+
+    try:
+        import inotify_simple  # noqa: F401
+    except ImportError:
+        print("⚠️ 未安装 inotify_simple，使用轮询模式")
+        poll_loop(index)
+        return
+
+    if not QQBOT_DIR.exists():
+        print("⚠️ qqbot 目录不存在，使用轮询模式")
+        poll_loop(index)
+        return
+
+    print("👀 inotify 监听中...")
+    watch_loop(index)
 
 if __name__ == "__main__":
     main()
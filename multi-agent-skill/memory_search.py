@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+跨智能体记忆搜索
+所有智能体的对话历史和知识（含冷数据）进同一个 n-gram 倒排索引（ngram_index），
+快照 memory/search_index.json + 追加日志 memory/search_index.log：
+增量变化只追加到日志，日志攒多了才合并进快照；
+查询前按各智能体记忆文件的 mtime 找出有变化的智能体，只同步这些
+
+用法: python3 memory_search.py update            # 同步全部智能体
+      python3 memory_search.py 幼儿园 体检         # 搜索
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from ngram_index import NgramIndex, make_snippet
+
+SKILL_DIR = Path(__file__).parent
+MEMORY_DIR = SKILL_DIR / "memory"
+INDEX_FILE = MEMORY_DIR / "search_index.json"
+LOG_FILE = MEMORY_DIR / "search_index.log"
+LOCK_FILE = MEMORY_DIR / "search_index.lock"
+COMPACT_AT = 5000       # 日志超过这么多条就合并进快照
+
+def history_doc_id(agent_id, turn):
+    return f"{agent_id}/h/{turn.get('timestamp')}"
+
+def knowledge_doc_id(agent_id, item):
+    digest = hashlib.sha1((item.get("type", "") + "\n" + item.get("content", "")).encode("utf-8")).hexdigest()
+    return f"{agent_id}/k/{digest[:16]}"
+
+def agent_docs(agent_id, mem):
+    """一个智能体应当在索引里的文档 {doc_id: (文本, 元数据)}"""
+    from knowledge_store import all_knowledge
+    docs = {}
+    for turn in mem.get("history", []):
+        if turn.get("content"):
+            docs[history_doc_id(agent_id, turn)] = (turn["content"], {
+                "agent": agent_id, "kind": "history", "role": turn.get("role"), "time": turn.get("timestamp"),
+            })
+    for item in all_knowledge(agent_id, mem):
+        if item.get("content"):
+            docs[knowledge_doc_id(agent_id, item)] = (item["content"], {
+                "agent": agent_id, "kind": "knowledge", "type": item.get("type"), "time": item.get("added_at"),
+            })
+    return docs
+
+class MemorySearch:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._load()
+        self._replay()
+
+    def _load(self):
+        """加载快照（调用方持有 self.lock 或还在构造中），之后从日志开头重放"""
+        self.index = NgramIndex.load(INDEX_FILE)
+        self.index.extra.setdefault("sources", {})
+        self.log_offset = 0
+        self.log_lines = 0
+        self.log_ino = None
+        self.by_agent = {}
+        for doc_id, doc in self.index.docs.items():
+            self.by_agent.setdefault(doc["meta"].get("agent"), set()).add(doc_id)
+
+    # ---------- 日志 ----------
+
+    def _apply(self, op):
+        if op["op"] == "add":
+            self.index.add(op["id"], op["text"], op["meta"])
+            self.by_agent.setdefault(op["meta"].get("agent"), set()).add(op["id"])
+        elif op["op"] == "remove":
+            self.index.remove(op["id"])
+            self.by_agent.get(op["id"].split("/", 1)[0], set()).discard(op["id"])
+        elif op["op"] == "source":
+            self.index.extra["sources"][op["agent"]] = op["stamp"]
+
+    def _replay(self):
+        """读日志里还没应用的部分（其他进程写入的）"""
+        if not LOG_FILE.exists():
+            self.log_offset = self.log_lines = 0
+            return
+        st = LOG_FILE.stat()
+        if self.log_ino is not None and st.st_ino != self.log_ino:
+            # 日志被别的进程合并进快照后换成了新文件，原地重新加载快照（锁不换），再重放新日志
+            self._load()
+        self.log_ino = st.st_ino
+        with open(LOG_FILE, "rb") as f:
+            f.seek(self.log_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    self._apply(json.loads(line))
+                except ValueError:
+                    pass
+                self.log_offset += len(line)
+                self.log_lines += 1
+
+    def _write_ops(self, ops):
+        with open(LOG_FILE, "ab") as f:
+            f.write("".join(json.dumps(op, ensure_ascii=False) + "\n" for op in ops).encode("utf-8"))
+        for op in ops:
+            self._apply(op)
+        self.log_offset = LOG_FILE.stat().st_size
+        self.log_lines += len(ops)
+
+    def _compact(self):
+        """快照落盘后换一个空日志文件（新 inode，其他进程据此发现需要重新加载）"""
+        self.index.save()
+        tmp = LOG_FILE.with_suffix(".tmp")
+        open(tmp, "w").close()
+        os.replace(tmp, LOG_FILE)
+        self.log_offset = self.log_lines = 0
+        self.log_ino = LOG_FILE.stat().st_ino
+
+    # ---------- 同步 ----------
+
+    def _stamp(self, agent_id):
+        from knowledge_store import cold_dir
+        stamps = []
+        for path in (MEMORY_DIR / f"{agent_id.replace('/', '_')}.json", cold_dir(agent_id) / "index.json"):
+            try:
+                stamps.append(path.stat().st_mtime_ns)
+            except OSError:
+                stamps.append(None)
+        return stamps
+
+    def sync(self, agent_ids=None):
+        """同步记忆文件有变化的智能体，返回 (新增, 删除) 文档数"""
+        from scheduler import load_config, load_memory
+        if agent_ids is None:
+            agent_ids = list(load_config().get("agents", {}))
+        added = removed = 0
+        with self.lock:
+            self._replay()
+            sources = self.index.extra["sources"]
+            changed = [(a, self._stamp(a)) for a in agent_ids]
+            changed = [(a, s) for a, s in changed if sources.get(a) != s]
+            if not changed:
+                return 0, 0
+            LOCK_FILE.parent.mkdir(exist_ok=True)
+            with open(LOCK_FILE, "w") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                self._replay()
+                # 重放时可能重新加载了快照，sources 要重新取
+                sources = self.index.extra["sources"]
+                ops = []
+                for agent_id, stamp in changed:
+                    if sources.get(agent_id) == stamp:
+                        continue
+                    wanted = agent_docs(agent_id, load_memory(agent_id))
+                    for doc_id, (text, meta) in wanted.items():
+                        doc = self.index.docs.get(doc_id)
+                        if doc is None or doc["text"] != text:
+                            ops.append({"op": "add", "id": doc_id, "text": text, "meta": meta})
+                            added += 1
+                    # 知识被删掉的移出索引；对话历史即使被摘要移走了也保留，仍然可以搜到
+                    for doc_id in self.by_agent.get(agent_id, set()) - set(wanted):
+                        if "/k/" in doc_id:
+                            ops.append({"op": "remove", "id": doc_id})
+                            removed += 1
+                    ops.append({"op": "source", "agent": agent_id, "stamp": stamp})
+                self._write_ops(ops)
+                if self.log_lines > COMPACT_AT:
+                    self._compact()
+        return added, removed
+
+    # ---------- 查询 ----------
+
+    def search(self, query, limit=20, agent_id=None):
+        self.sync()
+        with self.lock:
+            self._replay()
+            doc_filter = None
+            if agent_id:
+                ids = self.by_agent.get(agent_id, set())
+                doc_filter = ids.__contains__
+            results = []
+            for doc_id, score in self.index.search(query, limit, doc_filter):
+                doc = self.index.docs[doc_id]
+                meta = doc["meta"]
+                results.append({
+                    "agent": meta.get("agent"),
+                    "kind": meta.get("kind"),
+                    "role": meta.get("role"),
+                    "type": meta.get("type"),
+                    "time": meta.get("time"),
+                    "score": round(score, 3),
+                    "snippet": make_snippet(doc["text"], query),
+                })
+            return results
+
+# 进程内共用一个实例（dashboard 常驻时不必每次重新加载快照）
+_SEARCH = None
+_SEARCH_LOCK = threading.Lock()
+
+def get_search():
+    global _SEARCH
+    with _SEARCH_LOCK:
+        if _SEARCH is None:
+            _SEARCH = MemorySearch()
+        return _SEARCH
+
+def search_memory(query, limit=20, agent_id=None):
+    return get_search().search(query, limit, agent_id)
+
+if __name__ == "__main__":
+    import sys
+    import time
+    if len(sys.argv) < 2:
+        print("用法: python3 memory_search.py update | <关键词>")
+        sys.exit(1)
+    start = time.time()
+    if sys.argv[1] == "update":
+        added, removed = get_search().sync()
+        print(f"✅ 新增/更新 {added} 条，移除 {removed} 条，共 {len(get_search().index)} 条 ({time.time() - start:.2f}s)")
+    else:
+        query = " ".join(sys.argv[1:])
+        results = search_memory(query)
+        print(f"🔍 「{query}」找到 {len(results)} 条 ({(time.time() - start) * 1000:.1f}ms)")
+        for r in results:
+            print(f"• [{r['agent']}] {(r['time'] or '')[:16]} {r['snippet']}")
@@ -32,6 +32,31 @@ def get_current_model():
         pass
     return None
 
+OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434")
+DEFAULT_MODEL = "qwen:0.5b"
+
+def ollama_generate(prompt, model=None, system=None, options=None, timeout=120, context=None, keep_alive=None):
+    """通过 Ollama HTTP 接口生成（不启动 ollama run 子进程）
+    context: 上一次返回的 context，带上后接着那段对话继续，只评估新的 prompt
+    返回 {"response": 文本, "context", "prompt_eval_count", "prompt_eval_duration", "eval_duration", ...}，失败返回 {"error": ...}
+    """
+    import requests
+    body = {"model": model or DEFAULT_MODEL, "prompt": prompt, "stream": False}
+    if system:
+        body["system"] = system
+    if options:
+        body["options"] = options
+    if context:
+        body["context"] = context
+    if keep_alive:
+        body["keep_alive"] = keep_alive
+    try:
+        resp = requests.post(f"{OLLAMA_URL}/api/generate", json=body, timeout=timeout)
+        resp.raise_for_status()
+        return resp.json()
+    except Exception as e:
+        return {"error": str(e)}
+
 def get_ollama_version():
     """检查Ollama版本"""
     try:
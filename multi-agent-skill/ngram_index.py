@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+字符 n-gram 倒排索引
+中文按相邻两字切分（不需要分词器），英文/数字按整词，BM25 排序
+索引整体存成一个 JSON 文件，增量添加/删除文档后再保存
+"""
+
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from pathlib import Path
+
+TOKEN_RE = re.compile(r"[a-z0-9]+|[^\sa-z0-9!-/:-@\[-`{-~，。！？、；：“”‘’（）《》【】…·—]+")
+BM25_K1 = 1.2
+BM25_B = 0.75
+COMMON_DF = 0.05    # 出现在超过这个比例文档里的 gram 算常见
+
+def tokenize(text):
+    """切成检索单元：英文数字整词，中文相邻两字（单字的片段保留单字）"""
+    grams = []
+    for run in TOKEN_RE.findall(text.lower()):
+        if run.isascii():
+            grams.append(run)
+        elif len(run) == 1:
+            grams.append(run)
+        else:
+            grams.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return grams
+
+def make_snippet(text, query, width=40):
+    """截取命中位置附近的一段文字"""
+    text = " ".join(text.split())
+    pos = -1
+    for gram in [query.strip().lower()] + tokenize(query):
+        pos = text.lower().find(gram)
+        if pos >= 0:
+            break
+    if pos < 0:
+        return text[:width * 2]
+    start = max(0, pos - width)
+    end = min(len(text), pos + width)
+    return ("…" if start else "") + text[start:end] + ("…" if end < len(text) else "")
+
+class NgramIndex:
+    """docs: {doc_id: {"text": 原文, "len": 词数, "meta": {...}}}
+    postings: {gram: {doc_id: 词频}}
+    extra: 调用方自己的附加数据，随索引一起保存
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else None
+        self.docs = {}
+        self.postings = {}
+        self.total_len = 0
+        self.extra = {}
+        self.lock = threading.RLock()
+
+    @classmethod
+    def load(cls, path):
+        index = cls(path)
+        if index.path and index.path.exists():
+            with open(index.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            index.docs = data.get("docs", {})
+            index.postings = data.get("postings", {})
+            index.extra = data.get("extra", {})
+            index.total_len = sum(d["len"] for d in index.docs.values())
+        return index
+
+    def save(self):
+        with self.lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"docs": self.docs, "postings": self.postings, "extra": self.extra}, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.docs
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, doc_id, text, meta=None):
+        """添加或替换文档"""
+        with self.lock:
+            if doc_id in self.docs:
+                self.remove(doc_id)
+            grams = tokenize(text)
+            counts = {}
+            for g in grams:
+                counts[g] = counts.get(g, 0) + 1
+            for g, tf in counts.items():
+                self.postings.setdefault(g, {})[doc_id] = tf
+            self.docs[doc_id] = {"text": text, "len": len(grams), "meta": meta or {}}
+            self.total_len += len(grams)
+
+    def remove(self, doc_id):
+        with self.lock:
+            doc = self.docs.pop(doc_id, None)
+            if not doc:
+                return
+            for g in set(tokenize(doc["text"])):
+                plist = self.postings.get(g)
+                if plist:
+                    plist.pop(doc_id, None)
+                    if not plist:
+                        del self.postings[g]
+            self.total_len -= doc["len"]
+
+    def search(self, query, limit=20, doc_filter=None):
+        """BM25 检索，返回 [(doc_id, 分数), ...]"""
+        grams = set(tokenize(query))
+        if not grams or not self.docs:
+            return []
+        n_docs = len(self.docs)
+        avg_len = self.total_len / n_docs or 1
+        docs = self.docs
+        # norm = k1 * (1 - b + b * len / avg_len) = base + slope * len
+        base = BM25_K1 * (1 - BM25_B)
+        slope = BM25_K1 * BM25_B / avg_len
+        k1_plus = BM25_K1 + 1
+        scores = {}
+        get = scores.get
+        with self.lock:
+            plists = [self.postings[g] for g in grams if g in self.postings]
+            plists.sort(key=len)
+            for plist in plists:
+                idf = math.log(1 + (n_docs - len(plist) + 0.5) / (len(plist) + 0.5)) * k1_plus
+                if scores and len(plist) > COMMON_DF * n_docs:
+                    # 很常见的 gram 只给已经命中较少见 gram 的文档加分，不再遍历整个倒排表
+                    for doc_id in scores:
+                        tf = plist.get(doc_id)
+                        if tf:
+                            scores[doc_id] += idf * tf / (tf + base + slope * docs[doc_id]["len"])
+                    continue
+                for doc_id, tf in plist.items():
+                    if doc_filter and not doc_filter(doc_id):
+                        continue
+                    scores[doc_id] = get(doc_id, 0.0) + idf * tf / (tf + base + slope * docs[doc_id]["len"])
+        return heapq.nlargest(limit, scores.items(), key=lambda x: x[1])
+
+# 按文件修改时间缓存已加载的索引，查询接口不必每次重新解析
+_LOADED = {}
+_LOADED_LOCK = threading.Lock()
+
+def load_cached(path):
+    path = Path(path)
+    mtime = path.stat().st_mtime if path.exists() else None
+    with _LOADED_LOCK:
+        cached = _LOADED.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        index = NgramIndex.load(path)
+        _LOADED[path] = (mtime, index)
+        return index
@@ -1,46 +1,339 @@
 #!/usr/bin/env python3
 """
 在线OCR - 使用免费的OCR.space API
+- 结果按图片内容哈希（URL 按地址）缓存，同一张图不重复识别
+- 批量模式：有限并发 + 限流退避
+- 后端可替换：ocrspace（在线）/ tesseract（本地）
+- 上传前识别真实格式，按像素预算缩小重新编码，base64 流式生成请求体
 """
 
 import base64
-import requests
-import sys
+import hashlib
+import io
 import json
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import requests
+
+SKILL_DIR = Path(__file__).parent
+CACHE_DIR = SKILL_DIR / "cache" / "ocr"
+MAX_RETRIES = 3
+OCR_MAX_PIXELS = 2_500_000      # 上传前缩小到这个像素数以内（约 1920x1300，OCR 足够）
+JPEG_QUALITY = 85
+STREAM_CHUNK = 3 * 64 * 1024    # 3 的倍数，分块 base64 不产生填充
+
+MAGIC_TYPES = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+]
+
+class RateLimited(Exception):
+    """后端限流"""
+    def __init__(self, retry_after=None):
+        super().__init__("rate limited")
+        self.retry_after = retry_after
+
+# ========== 上传前编码 ==========
+
+def detect_mime(header):
+    """按文件头判断真实格式"""
+    for magic, mime in MAGIC_TYPES:
+        if header.startswith(magic):
+            return mime
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/jpeg"
+
+class PreparedImage:
+    """待上传的图片：缩小后的字节，或原文件（分块读取）"""
+
+    def __init__(self, path, mime, original_size, data=None):
+        self.path = path
+        self.mime = mime
+        self.original_size = original_size
+        self.data = data
+        self.upload_size = len(data) if data is not None else original_size
+
+    @property
+    def bytes_saved(self):
+        return self.original_size - self.upload_size
+
+    def chunks(self):
+        if self.data is not None:
+            for i in range(0, len(self.data), STREAM_CHUNK):
+                yield self.data[i:i + STREAM_CHUNK]
+            return
+        with open(self.path, "rb") as f:
+            for chunk in iter(lambda: f.read(STREAM_CHUNK), b""):
+                yield chunk
+
+def prepare_image(image_path, max_pixels=OCR_MAX_PIXELS):
+    """超过像素预算的图片缩小后重新编码；没装 Pillow 时原样上传"""
+    original_size = Path(image_path).stat().st_size
+    with open(image_path, "rb") as f:
+        mime = detect_mime(f.read(16))
 
-def ocr_image(image_path_or_url):
-    """OCR识别图片文字"""
-    
-    # 如果是URL直接用URL
-    if image_path_or_url.startswith("http"):
-        url = "https://api.ocr.space/parse/image"
-        payload = {"url": image_path_or_url, "language": "chs"}
-    else:
-        # 本地图片转base64
-        with open(image_path_or_url, "rb") as f:
-            img_base64 = base64.b64encode(f.read()).decode()
-        url = "https://api.ocr.space/parse/imagebase64"
-        payload = {"base64Image": f"data:image/jpeg;base64,{img_base64}", "language": "chs"}
-    
-    # 免费API，不需要key（但有频率限制）
-    headers = {"apikey": "helloworld"}
-    
     try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return PreparedImage(image_path, mime, original_size)
+
+    try:
+        with Image.open(image_path) as img:
+            img = ImageOps.exif_transpose(img)
+            width, height = img.size
+            resized = width * height > max_pixels
+            if resized:
+                scale = (max_pixels / (width * height)) ** 0.5
+                img = img.resize((max(1, int(width * scale)), max(1, int(height * scale))), Image.LANCZOS)
+
+            # 截图类 PNG 保持无损，其余统一转 JPEG
+            buf = io.BytesIO()
+            if mime == "image/png":
+                img.save(buf, format="PNG", optimize=True)
+                new_mime = "image/png"
+            else:
+                img.convert("RGB").save(buf, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+                new_mime = "image/jpeg"
+    except Exception:
+        return PreparedImage(image_path, mime, original_size)
+
+    data = buf.getvalue()
+    if not resized and len(data) >= original_size:
+        return PreparedImage(image_path, mime, original_size)
+    return PreparedImage(image_path, new_mime, original_size, data)
+
+class Base64FormBody:
+    """multipart/form-data 请求体，图片分块 base64 编码后逐块发送
+    base64 长度可以提前算出，所以能带 Content-Length 而不用整块放进内存
+    """
+
+    def __init__(self, prepared, fields):
+        self.boundary = "----ocr" + hashlib.md5(str(time.time()).encode()).hexdigest()
+        head = "".join(
+            f'--{self.boundary}\r\nContent-Disposition: form-data; name="{k}"\r\n\r\n{v}\r\n'
+            for k, v in fields.items()
+        )
+        head += (f'--{self.boundary}\r\nContent-Disposition: form-data; name="base64Image"\r\n\r\n'
+                 f"data:{prepared.mime};base64,")
+        self.head = head.encode()
+        self.tail = f"\r\n--{self.boundary}--\r\n".encode()
+        self.prepared = prepared
+
+    @property
+    def content_type(self):
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self):
+        return len(self.head) + (self.prepared.upload_size + 2) // 3 * 4 + len(self.tail)
+
+    def __iter__(self):
+        yield self.head
+        for chunk in self.prepared.chunks():
+            yield base64.b64encode(chunk)
+        yield self.tail
+
+# ========== 后端 ==========
+
+class OCRSpaceBackend:
+    """OCR.space 免费API，不需要key（但有频率限制）"""
+    name = "ocrspace"
+    min_interval = 1.0   # 两次请求之间最少间隔（秒）
+    uploads_image = True
+
+    def recognize(self, image_path_or_url, prepared=None):
+        headers = {"apikey": "helloworld"}
+        # 如果是URL直接用URL
+        if image_path_or_url.startswith("http"):
+            url = "https://api.ocr.space/parse/image"
+            payload = {"url": image_path_or_url, "language": "chs"}
+        else:
+            # 本地图片边编码边上传
+            prepared = prepared or prepare_image(image_path_or_url)
+            url = "https://api.ocr.space/parse/imagebase64"
+            payload = Base64FormBody(prepared, {"language": "chs"})
+            headers["Content-Type"] = payload.content_type
+
         response = requests.post(url, data=payload, headers=headers, timeout=30)
+        if response.status_code == 429:
+            raise RateLimited(response.headers.get("Retry-After"))
         result = response.json()
-        
+
         if result.get("ParsedResults"):
-            text = result["ParsedResults"][0]["ParsedText"]
-            return text
+            return True, result["ParsedResults"][0]["ParsedText"]
+        message = str(result.get("ErrorMessage", ""))
+        if "maximum" in message or "rate" in message.lower():
+            raise RateLimited()
+        return False, f"识别失败: {result}"
+
+class TesseractBackend:
+    """本地 tesseract（需要安装 tesseract-ocr 和 chi_sim 语言包）"""
+    name = "tesseract"
+    min_interval = 0
+    uploads_image = False
+
+    def recognize(self, image_path_or_url, prepared=None):
+        if image_path_or_url.startswith("http"):
+            return False, "识别失败: 本地后端不支持URL"
+        result = subprocess.run(
+            ["tesseract", image_path_or_url, "stdout", "-l", "chi_sim+eng"],
+            capture_output=True, text=True, timeout=60
+        )
+        if result.returncode != 0:
+            return False, f"识别失败: {result.stderr.strip()[:200]}"
+        return True, result.stdout
+
+BACKENDS = {
+    "ocrspace": OCRSpaceBackend(),
+    "tesseract": TesseractBackend(),
+}
+DEFAULT_BACKEND = "ocrspace"
+
+def get_backend(backend=None):
+    if backend is None:
+        return BACKENDS[DEFAULT_BACKEND]
+    if isinstance(backend, str):
+        return BACKENDS[backend]
+    return backend
+
+# ========== 缓存 ==========
+
+def cache_key(image_path_or_url):
+    """本地文件按内容哈希，URL 按地址哈希"""
+    if image_path_or_url.startswith("http"):
+        return "url_" + hashlib.sha256(image_path_or_url.encode()).hexdigest()
+    h = hashlib.sha256()
+    with open(image_path_or_url, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def cache_path(backend, key):
+    return CACHE_DIR / backend.name / f"{key}.json"
+
+def load_cached(backend, key):
+    path = cache_path(backend, key)
+    if path.exists():
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("text")
+    return None
+
+def save_cached(backend, key, source, text):
+    path = cache_path(backend, key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"source": source, "text": text, "created_at": datetime.now().isoformat()},
+                  f, ensure_ascii=False, indent=2)
+    tmp.replace(path)
+
+# ========== 限流 ==========
+
+class RateLimiter:
+    """保证同一后端的请求之间至少间隔 min_interval 秒（多线程共享）"""
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.time()
+            delay = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.min_interval
+        if delay > 0:
+            time.sleep(delay)
+
+    def backoff(self, seconds):
+        """被限流后整体推迟"""
+        with self.lock:
+            self.next_time = max(self.next_time, time.time() + seconds)
+
+def recognize_with_retry(backend, image_path_or_url, limiter=None, prepared=None):
+    """调用后端，限流时退避重试"""
+    for attempt in range(MAX_RETRIES):
+        if limiter:
+            limiter.wait()
+        try:
+            return backend.recognize(image_path_or_url, prepared)
+        except RateLimited as e:
+            delay = float(e.retry_after) if e.retry_after else 5 * 2 ** attempt
+            print(f"⏳ 被限流，{delay:.0f}秒后重试", file=sys.stderr)
+            if limiter:
+                limiter.backoff(delay)
+            else:
+                time.sleep(delay)
+    return False, "识别失败: 请求过于频繁"
+
+# ========== 接口 ==========
+
+def ocr_one(image_path_or_url, backend=None, use_cache=True, limiter=None):
+    """识别一张图片，返回结果字典"""
+    backend = get_backend(backend)
+    start = time.time()
+    result = {"source": image_path_or_url, "cached": False}
+    try:
+        key = cache_key(image_path_or_url)
+        text = load_cached(backend, key) if use_cache else None
+        if text is not None:
+            result.update({"success": True, "text": text, "cached": True})
         else:
-            return f"识别失败: {result}"
+            prepared = None
+            if backend.uploads_image and not image_path_or_url.startswith("http"):
+                prepared = prepare_image(image_path_or_url)
+                result["bytes_saved"] = prepared.bytes_saved
+            ok, text = recognize_with_retry(backend, image_path_or_url, limiter, prepared)
+            if ok:
+                save_cached(backend, key, image_path_or_url, text)
+            result.update({"success": ok, "text": text})
     except Exception as e:
-        return f"错误: {e}"
+        result.update({"success": False, "text": f"错误: {e}"})
+    result["elapsed"] = round(time.time() - start, 3)
+    return result
+
+def ocr_image(image_path_or_url, backend=None, use_cache=True):
+    """OCR识别图片文字"""
+    return ocr_one(image_path_or_url, backend, use_cache)["text"]
+
+def ocr_batch(images, backend=None, workers=4, use_cache=True):
+    """批量识别，结果顺序与输入一致"""
+    backend = get_backend(backend)
+    limiter = RateLimiter(backend.min_interval)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda img: ocr_one(img, backend, use_cache, limiter), images))
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("用法: python3 ocr_image.py <图片路径或URL>")
-        sys.exit(1)
-    
-    result = ocr_image(sys.argv[1])
-    print(result)
+    import argparse
+    parser = argparse.ArgumentParser(description="OCR识别图片文字")
+    parser.add_argument("images", nargs="+", help="图片路径或URL")
+    parser.add_argument("-j", "--jobs", type=int, default=4, help="并发数")
+    parser.add_argument("--backend", default=DEFAULT_BACKEND, choices=list(BACKENDS))
+    parser.add_argument("--no-cache", action="store_true", help="不使用缓存")
+    args = parser.parse_args()
+
+    if len(args.images) == 1:
+        r = ocr_one(args.images[0], args.backend, not args.no_cache)
+        print(r["text"])
+        if r.get("bytes_saved"):
+            print(f"📉 上传节省 {r['bytes_saved'] / 1024:.0f}KB", file=sys.stderr)
+    else:
+        results = ocr_batch(args.images, args.backend, args.jobs, not args.no_cache)
+        for r in results:
+            flag = "缓存" if r["cached"] else f"{r['elapsed']}s"
+            if r.get("bytes_saved"):
+                flag += f", 节省{r['bytes_saved'] / 1024:.0f}KB"
+            print(f"===== {r['source']} ({flag}) =====")
+            print(r["text"])
+        saved = sum(r.get("bytes_saved", 0) for r in results)
+        if saved:
+            print(f"📉 共节省上传 {saved / 1024:.0f}KB", file=sys.stderr)
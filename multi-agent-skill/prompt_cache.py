@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+智能体 system prompt 缓存
+每个智能体缓存还没并入摘要的对话（已格式化成行）、自己的知识和拼好的 prompt；
+写记忆时（save_memory -> memory_saved）：只追加了一轮对话、且缓存和读出记忆时的文件一致的，
+在缓存末尾加一行，其余按写入的内容重建；共享知识变化时只替换共享部分。
+文件被别的进程（dashboard、任务执行器、摘要）改过时按 mtime 发现并重新加载
+"""
+
+import json
+import os
+import threading
+
+SHARED_ITEMS = 10
+
+def file_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+def format_turn(turn):
+    label = "你" if turn.get("role") == "assistant" else "用户"
+    return f"{label}: {turn.get('content', '')}"
+
+class AgentEntry:
+    __slots__ = ("history", "knowledge", "summary", "mtime", "key", "shared_version", "prompt")
+
+    def __init__(self, mem, mtime, history_turns):
+        self.history = [format_turn(h) for h in mem.get("history", [])[-history_turns:]]
+        self.knowledge = mem.get("knowledge", [])
+        self.summary = mem.get("summary", {}).get("text", "")
+        self.mtime = mtime
+        self.key = None
+        self.shared_version = None
+        self.prompt = None
+
+class PromptCache:
+    """memory_path(agent_id) -> 记忆文件路径；load_memory(agent_id) -> 记忆字典
+    history_turns: 缓存最近多少轮对话
+    """
+
+    def __init__(self, memory_path, load_memory, shared_path, history_turns):
+        self.memory_path = memory_path
+        self.history_turns = history_turns
+        self.load_memory = load_memory
+        self.shared_path = shared_path
+        self.entries = {}
+        self.shared_items = []
+        self.shared_mtime = None
+        self.shared_version = 0
+        self.lock = threading.RLock()
+
+    # ---------- 共享知识 ----------
+
+    def _check_shared(self):
+        mtime = file_mtime(self.shared_path)
+        if mtime == self.shared_mtime:
+            return
+        items = []
+        if mtime is not None:
+            try:
+                with open(self.shared_path, "r", encoding="utf-8") as f:
+                    items = json.load(f).get("items", [])
+            except Exception:
+                pass
+        self._set_shared(items, mtime)
+
+    def _set_shared(self, items, mtime):
+        self.shared_items = items
+        self.shared_mtime = mtime
+        self.shared_version += 1
+
+    def shared_changed(self, items):
+        """写完 knowledge.json 后调用，直接换上新列表，不用重新读文件"""
+        with self.lock:
+            self._set_shared(list(items), file_mtime(self.shared_path))
+
+    def shared(self):
+        with self.lock:
+            self._check_shared()
+            return self.shared_items
+
+    # ---------- 智能体记忆 ----------
+
+    def entry(self, agent_id):
+        with self.lock:
+            mtime = file_mtime(self.memory_path(agent_id))
+            entry = self.entries.get(agent_id)
+            if entry is None or entry.mtime != mtime:
+                entry = AgentEntry(self.load_memory(agent_id), mtime, self.history_turns)
+                self.entries[agent_id] = entry
+            return entry
+
+    def memory_saved(self, agent_id, mem, loaded_mtime=None, appended=None):
+        """save_memory 写完文件后调用
+        loaded_mtime: mem 读出来时文件的 mtime；appended: 只在 history 末尾追加了这一轮时传入
+        缓存和读出 mem 时的文件一致（mtime 相同）又只是追加一轮时，就地追加一行；
+        否则（别的进程写过、整份改写）按 mem 重建
+        """
+        with self.lock:
+            mtime = file_mtime(self.memory_path(agent_id))
+            entry = self.entries.get(agent_id)
+            if appended is not None and entry is not None and loaded_mtime is not None and entry.mtime == loaded_mtime:
+                entry.history.append(format_turn(appended))
+                del entry.history[:-self.history_turns]
+                entry.knowledge = mem.get("knowledge", [])
+                entry.mtime = mtime
+                entry.prompt = None
+                return
+            self.entries[agent_id] = AgentEntry(mem, mtime, self.history_turns)
+
+    # ---------- prompt ----------
+
+    def prompt(self, agent_id, key, render):
+        """key: 人格相关配置（角色、描述、名字），变了就重新拼；
+        render(entry, shared_items) -> 要缓存的 prompt（字符串或分段）
+        """
+        with self.lock:
+            self._check_shared()
+            entry = self.entry(agent_id)
+            if entry.prompt is not None and entry.key == key and entry.shared_version == self.shared_version:
+                return entry.prompt
+            entry.prompt = render(entry, self.shared_items[-SHARED_ITEMS:])
+            entry.key = key
+            entry.shared_version = self.shared_version
+            return entry.prompt
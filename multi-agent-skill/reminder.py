@@ -75,7 +75,9 @@ def get_today_schedule():
     
     schedules = []
     
-    for item in memory.get("knowledge", []):
+    # 热数据 + 冷数据里可能含今天及以后日期的段
+    from knowledge_store import schedules as find_schedules
+    for item in find_schedules("001", memory, since=today.isoformat()):
         if item.get("type") == "日程":
             content = item.get("content", "")
             
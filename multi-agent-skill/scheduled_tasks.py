@@ -3,6 +3,7 @@
 定时任务汇总脚本
 - 每天8:30发送日程
 - 每30分钟检查任务进度并汇报
+- 空闲时把智能体较早的对话并入摘要
 """
 
 import json
@@ -50,13 +51,20 @@ def task_progress():
         msg = "主人，小风现在给您汇报任务进度了～\n" + "\n".join(lines) + "\n～喵喵喵～\n进度汇报完毕！"
         send_qq(msg)
 
+def summarize_history():
+    """空闲智能体的老对话并入滚动摘要"""
+    from summarizer import summarize_idle_agents
+    summarize_idle_agents()
+
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser()
-    parser.add_argument("action", choices=["daily", "progress"])
+    parser.add_argument("action", choices=["daily", "progress", "summarize"])
     args = parser.parse_args()
     
     if args.action == "daily":
         daily_schedule()
     elif args.action == "progress":
         task_progress()
+    elif args.action == "summarize":
+        summarize_history()
@@ -40,11 +40,35 @@ def load_memory(name):
             return json.load(f)
     return {"agent_name": name, "history": [], "knowledge": []}
 
-def save_memory(name, mem):
+def memory_lock(name):
+    """同一智能体记忆的读-改-写互斥（跨进程、跨线程），用法: with memory_lock(编号): ...
+    save_history 和 summarizer 都会改写 history，不加锁时后写的会覆盖先写的"""
+    import fcntl
+    f = open(MEMORY_DIR / f"{name.replace('/', '_')}.lock", "w")
+    fcntl.flock(f, fcntl.LOCK_EX)
+    return f  # 关闭文件即释放锁
+
+def save_memory(name, mem, loaded_mtime=None, appended=None):
+    """loaded_mtime/appended: 只追加了一轮对话时由 save_history 传入，prompt 缓存就地追加（见 PromptCache.memory_saved）"""
     path = get_memory_path(name)
+    # 知识太多时把冷数据归档成压缩段，记忆文件只留热数据
+    from knowledge_store import archive, ARCHIVE_AT
+    if len(mem.get("knowledge", [])) > ARCHIVE_AT:
+        archive(name, mem)
     mem["last_updated"] = datetime.now().isoformat()
     with open(path, "w", encoding="utf-8") as f:
         json.dump(mem, f, ensure_ascii=False, indent=2)
+    from agent_meta import memory_saved
+    memory_saved(name, mem)
+    PROMPT_CACHE.memory_saved(name, mem, loaded_mtime, appended)
+
+# history 的硬上限；平时由 summarizer.py 在空闲时把老对话并入摘要，不会涨到这么多
+MAX_HISTORY = 300
+
+# prompt 缓存：热点智能体不必每次重读记忆和共享知识
+# history 里的轮次都缓存，实际放进 prompt 多少轮由 context_budget 按预算决定
+from prompt_cache import PromptCache, file_mtime
+PROMPT_CACHE = PromptCache(get_memory_path, load_memory, SHARED_DIR / "knowledge.json", MAX_HISTORY)
 
 # ===== 任务管理 =====
 def load_tasks():
@@ -56,8 +80,13 @@ def load_tasks():
 def save_tasks(tasks):
     with open(TASKS_FILE, "w", encoding="utf-8") as f:
         json.dump(tasks, f, ensure_ascii=False, indent=2)
+    from agent_meta import tasks_saved
+    tasks_saved(tasks)
 
-def create_task(agent_id, task_content):
+def create_task(agent_id, task_content, subtasks=None):
+    """subtasks: 可选的子任务列表 [{"id", "agent_id", "content", "after": [依赖的子任务ID]}]，
+    有子任务的任务由 task_executor 按依赖图执行（见 task_dag.py），依赖有问题时抛 ValueError
+    """
     tasks = load_tasks()
     task_id = f"{agent_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
     tasks[task_id] = {
@@ -68,6 +97,9 @@ def create_task(agent_id, task_content):
         "created_at": datetime.now().isoformat(),
         "updated_at": datetime.now().isoformat()
     }
+    if subtasks:
+        from task_dag import normalize_subtasks
+        tasks[task_id]["subtasks"] = normalize_subtasks(subtasks)
     save_tasks(tasks)
     return task_id
 
@@ -115,6 +147,65 @@ def detect_agent(msg, config):
     
     return None, msg, None
 
+# 一句话点名多个智能体时：名字在句首、连接词/标点之后，或「让/请…」这类请求词在句首、连接词/标点之后
+CONNECTORS = "和跟与及、，。,;；:： \t\n"
+PARTICLES = "帮请让叫"
+
+def _mention_lead(msg, start):
+    """名字从 start 开始时，它作为点名的起点（含前面的请求词），不是点名返回 None
+    「小B帮小C查天气」里的小C跟在小B的话里，不算点名
+    """
+    if start == 0 or msg[start - 1] in CONNECTORS:
+        return start
+    if msg[start - 1] in PARTICLES and (start == 1 or msg[start - 2] in CONNECTORS):
+        return start - 1
+    return None
+
+def detect_agents(msg, config):
+    """找出消息里点名的所有智能体，返回 [(编号, 任务, 被呼唤的名字), ...]
+    「小B写文案，让小C写代码」各自的任务分开；「小B和小C各写一段」共用后面的任务
+    """
+    agents = config.get("agents", {})
+    name_to_id = {}
+    for agent_id, info in agents.items():
+        for name in info.get("names", [agent_id]):
+            name_to_id[name] = agent_id
+
+    # 长名字优先，已被占用的位置不再匹配
+    mentions = []
+    taken = [False] * len(msg)
+    for name in sorted(name_to_id, key=len, reverse=True):
+        start = msg.find(name)
+        while start >= 0:
+            end = start + len(name)
+            lead = _mention_lead(msg, start)
+            if lead is not None and not any(taken[start:end]):
+                mentions.append((start, end, lead, name_to_id[name], name))
+                for i in range(start, end):
+                    taken[i] = True
+            start = msg.find(name, start + 1)
+    mentions.sort()
+
+    result = []
+    seen = set()
+    segments = []
+    for i, (start, end, lead, agent_id, name) in enumerate(mentions):
+        # 自己的任务到下一个点名（含它前面的请求词）为止
+        stop = mentions[i + 1][2] if i + 1 < len(mentions) else len(msg)
+        segment = msg[end:stop].strip(CONNECTORS)
+        if segment and not segment.strip(PARTICLES + CONNECTORS):
+            # 只剩请求词（如「小B帮」），按旧的 detect_agent 把去掉名字的整句当任务
+            segment = (msg[:lead] + msg[end:]).strip(CONNECTORS)
+        segments.append(segment)
+    for i, (start, end, lead, agent_id, name) in enumerate(mentions):
+        if agent_id in seen:
+            continue
+        seen.add(agent_id)
+        # 自己后面没有任务（如「小B和小C…」里的小B）就用后面第一个非空的任务
+        task = next((seg for seg in segments[i:] if seg), "")
+        result.append((agent_id, task, name))
+    return result
+
 def get_agent_info(agent_id, config):
     """获取助手信息"""
     agents = config.get("agents", {})
@@ -126,8 +217,45 @@ def get_agent_display_name(agent_id, config):
     names = info.get("names", [agent_id])
     return names[0]  # 返回主名
 
-def build_system_prompt(agent_id, config):
-    """构建助手人格prompt"""
+def agent_model(info):
+    """智能体实际调用的本地模型：配置的是 Ollama 模型名就用它，否则用默认本地模型"""
+    from model_manager import DEFAULT_MODEL
+    model = info.get("model") or ""
+    return model if model and "/" not in model else DEFAULT_MODEL
+
+# 按任务检索知识：最多几条、总字数上限
+RETRIEVE_K = 5
+RETRIEVE_CHARS = 1200
+
+def select_knowledge(agent_id, task=None):
+    """没有任务时取最近的共享知识；有任务时从共享知识和自己的知识（含已归档的冷数据）里挑相关的"""
+    shared = PROMPT_CACHE.shared()
+    if not task:
+        return shared[-10:]
+    try:
+        from knowledge_retrieval import retrieve
+    except ImportError:  # 没装 numpy
+        return shared[-10:]
+    from knowledge_store import cold_items
+    own = PROMPT_CACHE.entry(agent_id).knowledge
+    return retrieve(task, [("shared", shared), (f"agent:{agent_id}", own), (f"cold:{agent_id}", cold_items(agent_id))],
+                    k=RETRIEVE_K, max_chars=RETRIEVE_CHARS)
+
+def build_prompt_with_stats(agent_id, config, task=None):
+    """构建助手人格prompt，按模型的 token 预算裁剪历史和知识
+    task: 当前任务，给出时只放入和任务相关的知识
+    返回 (prompt, 统计)，统计里有估算的 token 数，用来对照生成耗时
+    """
+    from context_budget import assemble
+    info = get_agent_info(agent_id, config)
+    head, tail = persona(agent_id, config)
+    history = PROMPT_CACHE.entry(agent_id).history
+    return assemble(head, history, select_knowledge(agent_id, task), tail,
+                    model=agent_model(info), task=task,
+                    knowledge_title="相关知识" if task else "共享知识")
+
+def persona(agent_id, config):
+    """人格部分 (head, tail)，head 以「## 对话历史」结尾"""
     info = get_agent_info(agent_id, config)
     
     role = info.get("role", "助手")
@@ -135,35 +263,26 @@ def build_system_prompt(agent_id, config):
     names = info.get("names", [agent_id])
     main_name = names[0]
     
-    mem = load_memory(agent_id)
-    history = mem.get("history", [])[-10:]
-    
-    hist_lines = []
-    for h in history:
-        label = "你" if h.get("role") == "assistant" else "用户"
-        hist_lines.append(f"{label}: {h.get('content', '')}")
-    hist_text = "\n".join(hist_lines) or "（暂无历史）"
-    
-    # 共享知识
-    shared_path = SHARED_DIR / "knowledge.json"
-    shared_text = ""
-    if shared_path.exists():
-        with open(shared_path, "r", encoding="utf-8") as f:
-            shared = json.load(f)
-        items = shared.get("items", [])[-10:]
-        if items:
-            shared_text = "\n\n## 共享知识\n" + "\n".join([f"- {i.get('content')}" for i in items])
-    
-    return f"""你是{agent_id}智能体，主名「{main_name}」，{role}。
+    def render(entry, items):
+        # 人格部分（含早先对话的摘要）按智能体缓存；历史和知识每次按预算拼
+        summary_text = f"\n## 早先对话摘要\n{entry.summary}\n" if entry.summary else ""
+        head = f"""你是{agent_id}智能体，主名「{main_name}」，{role}。
 {desc}
 
 ## 可用名字：{"、".join(names)}
-
+{summary_text}
 ## 对话历史
-{hist_text}
-{shared_text}
+"""
+        tail = f"""
 
 你是{main_name}，用这个身份专业地回复用户。"""
+        return head, tail
+    
+    return PROMPT_CACHE.prompt(agent_id, (role, desc, tuple(names)), render)
+
+def build_system_prompt(agent_id, config, task=None):
+    """构建助手人格prompt（按智能体缓存，历史/共享知识变化时增量更新）"""
+    return build_prompt_with_stats(agent_id, config, task)[0]
 
 def handle_command(msg, config):
     """管理命令"""
@@ -174,14 +293,15 @@ def handle_command(msg, config):
         agents = config.get("agents", {})
         if not agents:
             return "📋 暂无智能体"
+        from agent_meta import load_meta
         lines = ["📋 已注册的智能体："]
         for aid, info in agents.items():
             names = info.get("names", [aid])
             main_name = names[0]
-            mem = load_memory(aid)
-            cnt = len(mem.get("history", []))
-            agt_tasks = {k: v for k, v in get_all_tasks().items() if v.get("agent_id") == aid and v.get("status") == "进行中"}
-            status = f" (任务: {len(agt_tasks)}进行中)" if agt_tasks else ""
+            meta = load_meta(aid)
+            cnt = meta.get("history_count", 0)
+            active = meta.get("active_tasks", 0)
+            status = f" (任务: {active}进行中)" if active else ""
             lines.append(f"• {aid} | 主名「{main_name}」| {info.get('role')} (历史{cnt}条){status}")
         return "\n".join(lines)
     
@@ -227,6 +347,21 @@ def handle_command(msg, config):
             return f"❌ {agent_id} 不存在"
         return "❌ 格式：删除 编号"
     
+    # 搜索所有智能体的对话和知识
+    if msg.startswith("搜索记忆"):
+        query = msg[len("搜索记忆"):].strip()
+        if not query:
+            return "❌ 格式：搜索记忆 关键词"
+        from memory_search import search_memory
+        results = search_memory(query, limit=5)
+        if not results:
+            return f"🔍 没有找到「{query}」相关的记忆"
+        lines = [f"🔍 「{query}」相关记忆："]
+        for r in results:
+            when = (r["time"] or "")[:16].replace("T", " ")
+            lines.append(f"• [{get_agent_display_name(r['agent'], config)}] {when} {r['snippet']}")
+        return "\n".join(lines)
+    
     # 记忆详情
     if msg.startswith("记忆 ") or msg.startswith("查看记忆 "):
         parts = msg.split(maxsplit=1)
@@ -237,9 +372,9 @@ def handle_command(msg, config):
             if not agent_id:
                 # 直接当ID处理
                 agent_id = query
-            mem = load_memory(agent_id)
-            hist = mem.get("history", [])
-            return f"📊 {agent_id} 历史{len(hist)}条"
+            from agent_meta import load_meta
+            meta = load_meta(agent_id)
+            return f"📊 {agent_id} 历史{meta.get('history_count', 0)}条"
         return "❌ 格式：记忆 编号"
     
     # 任务列表
@@ -253,6 +388,19 @@ def handle_command(msg, config):
             lines.append(f"  • {t.get('agent_id')}: {t.get('content', '')[:30]}... [{t.get('progress')}]")
         return "\n".join(lines)
     
+    # 多智能体流程：「流程 小D写需求 -> 小C写代码，小B写文案」
+    if msg.startswith("流程 "):
+        from task_dag import parse_pipeline
+        text = msg[len("流程 "):].strip()
+        subtasks = parse_pipeline(text, config)
+        if not subtasks:
+            return "❌ 格式：流程 小D写需求 -> 小C写代码，小B写文案"
+        task_id = create_task(subtasks[0]["agent_id"], text, subtasks)
+        stages = {}
+        for st in subtasks:
+            stages.setdefault(tuple(st["after"]), []).append(get_agent_display_name(st["agent_id"], config))
+        return f"✅ 已创建流程任务 {task_id}：" + " → ".join("、".join(names) for names in stages.values())
+    
     # 共享知识
     if msg.startswith("共享 "):
         parts = msg.split(maxsplit=1)
@@ -267,6 +415,7 @@ def handle_command(msg, config):
             shared["items"].append({"content": content, "added_at": datetime.now().isoformat()})
             with open(shared_path, "w") as f:
                 json.dump(shared, f, ensure_ascii=False, indent=2)
+            PROMPT_CACHE.shared_changed(shared["items"])
             return "✅ 已添加到共享知识库"
         return "❌ 格式：共享 内容"
     
@@ -275,21 +424,134 @@ def handle_command(msg, config):
         return """📖 命令：
 🎯 呼唤智能体：001、002... 或 主名/昵称
 📋 管理：列出助手 / 添加 编号 角色 名字 / 删除 编号
-📊 记忆：记忆 编号
-📋 任务：任务 / 任务列表"""
+📊 记忆：记忆 编号 / 搜索记忆 关键词
+📋 任务：任务 / 任务列表 / 流程 小D写需求 -> 小C写代码，小B写文案"""
     
     return None
 
 def save_history(agent_id, role, content):
-    mem = load_memory(agent_id)
-    mem.setdefault("history", []).append({
-        "role": role,
-        "content": content,
-        "timestamp": datetime.now().isoformat()
-    })
-    if len(mem["history"]) > 100:
-        mem["history"] = mem["history"][-100:]
-    save_memory(agent_id, mem)
+    with memory_lock(agent_id):
+        # 读前读后 mtime 一致，才能确定读到的就是这个 mtime 对应的内容
+        loaded_mtime = file_mtime(get_memory_path(agent_id))
+        mem = load_memory(agent_id)
+        if file_mtime(get_memory_path(agent_id)) != loaded_mtime:
+            loaded_mtime = None
+        turn = {
+            "role": role,
+            "content": content,
+            "timestamp": datetime.now().isoformat()
+        }
+        mem.setdefault("history", []).append(turn)
+        if len(mem["history"]) > MAX_HISTORY:
+            mem["history"] = mem["history"][-MAX_HISTORY:]
+        save_memory(agent_id, mem, loaded_mtime, turn)
+
+# ===== 调用智能体 =====
+GENERATION_LOG = MEMORY_DIR / "generation_stats.jsonl"
+AGENT_TIMEOUT = 120
+
+def log_generation(record):
+    """prompt 大小和生成耗时记一行，方便对照"""
+    try:
+        with open(GENERATION_LOG, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError:
+        pass
+
+def task_prompt(agent_id, task, in_prefix):
+    """复用 context 时前缀里只有最近的共享知识，和任务相关的其他知识放在本轮的 prompt 前面"""
+    seen = {item.get("content") for item in in_prefix}
+    extra = [item for item in select_knowledge(agent_id, task) if item.get("content") not in seen]
+    if not extra:
+        return task
+    return "## 相关知识\n" + "\n".join(f"- {item.get('content', '')}" for item in extra) + "\n\n" + task
+
+def run_agent(agent_id, task, config, strict=False):
+    """让一个智能体处理任务：拼 prompt、调用本地模型、写入它自己的历史，返回回复
+    strict: 没有回复时抛 RuntimeError（子任务用，失败才能让下游跳过），否则返回一句提示
+    开启上下文复用（kv_context）时，system 只在开新对话时发送且不含任务相关内容，
+    之后带上 Ollama 返回的 context，只评估新的一轮
+    """
+    import time
+    import kv_context
+    from context_budget import estimate_tokens
+    from model_manager import ollama_generate
+    info = get_agent_info(agent_id, config)
+    model = agent_model(info)
+
+    with kv_context.agent_lock(agent_id):
+        context = None
+        if kv_context.ENABLED:
+            head, tail = persona(agent_id, config)
+            shared = select_knowledge(agent_id)
+            key = kv_context.prefix_key(model, head, tail, shared)
+            prompt = task_prompt(agent_id, task, shared)
+            context = kv_context.load_context(agent_id, key, model, PROMPT_CACHE.entry(agent_id).mtime,
+                                              estimate_tokens(prompt))
+            if context:
+                system, stats = None, {"tokens": estimate_tokens(prompt)}
+            else:
+                system, stats = build_prompt_with_stats(agent_id, config)
+                stats["tokens"] += estimate_tokens(prompt)
+        else:
+            prompt = task
+            system, stats = build_prompt_with_stats(agent_id, config, task)
+
+        start = time.time()
+        result = ollama_generate(prompt, model=model, system=system, timeout=AGENT_TIMEOUT,
+                                 options={"num_ctx": kv_context.num_ctx(model)}, context=context,
+                                 keep_alive=kv_context.KEEP_ALIVE if kv_context.ENABLED else None)
+        elapsed = time.time() - start
+        reply = (result.get("response") or "").strip()
+        log_generation({
+            "agent": agent_id,
+            "model": model,
+            "prompt_tokens": stats["tokens"],
+            "context_reused": bool(context),
+            "context_tokens": len(context or []),
+            "prompt_eval_count": result.get("prompt_eval_count"),
+            "prompt_eval_ms": (result.get("prompt_eval_duration") or 0) / 1e6,
+            "eval_ms": (result.get("eval_duration") or 0) / 1e6,
+            "elapsed_ms": round(elapsed * 1000),
+            "error": result.get("error"),
+            "time": datetime.now().isoformat(),
+        })
+        if not reply:
+            if context:
+                kv_context.clear_context(agent_id)
+            if strict:
+                raise RuntimeError(result.get("error", "空回复"))
+            return f"（{get_agent_display_name(agent_id, config)}暂时没有回复：{result.get('error', '空回复')}）"
+
+        save_history(agent_id, "user", task)
+        save_history(agent_id, "assistant", reply)
+        if kv_context.ENABLED and result.get("context"):
+            kv_context.save_context(agent_id, key, model, PROMPT_CACHE.entry(agent_id).mtime, result["context"])
+    return reply
+
+def dispatch(msg, config):
+    """把消息交给点名的智能体；点名多个时并发调用，回复按点名顺序合并
+    （Ollama 需要 OLLAMA_NUM_PARALLEL >= 智能体数才能真正并行生成）
+    没有点名任何智能体时返回 None
+    """
+    targets = detect_agents(msg, config)
+    if not targets:
+        return None
+    if len(targets) == 1:
+        agent_id, task, _ = targets[0]
+        return run_agent(agent_id, task, config)
+
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=len(targets)) as pool:
+        futures = [pool.submit(run_agent, agent_id, task, config) for agent_id, task, _ in targets]
+        replies = []
+        for (agent_id, _, _), future in zip(targets, futures):
+            try:
+                reply = future.result()
+            except Exception as e:
+                reply = f"（出错了：{e}）"
+            replies.append(f"【{get_agent_display_name(agent_id, config)}】\n{reply}")
+    return "\n\n".join(replies)
 
 # ===== 进度汇报 =====
 START_TEMPLATE = "主人，小风现在开始{agent}的任务了哟～喵喵喵！\n任务内容：{task}"
@@ -316,12 +578,26 @@ def get_task_report(agent_id=None):
 if __name__ == "__main__":
     config = load_config()
     
+    # 多智能体点名
+    checks = [
+        ("小B帮小C查一下天气", [("小B", "帮小C查一下天气")]),
+        ("小B写文案，让小C写代码", [("小B", "写文案"), ("小C", "写代码")]),
+        ("小B写文案，小C写代码", [("小B", "写文案"), ("小C", "写代码")]),
+        ("小B和小C各写一段", [("小B", "各写一段"), ("小C", "各写一段")]),
+        ("请小B写首诗", [("小B", "写首诗")]),
+        ("小B帮，小C查一下天气", [("小B", "帮，小C查一下天气"), ("小C", "查一下天气")]),
+    ]
+    for t, expected in checks:
+        got = [(name, task) for _, task, name in detect_agents(t, config)]
+        print(f"{'✅' if got == expected else '❌'} {t} -> {got}")
+
     # 测试
     print("=== v2.0 测试 ===")
     tests = [
         "001 帮我做个主图",
         "小B 写一篇文案", 
         "小文帮我写首诗",
+        "小B和小C各写一段",
         "列出助手",
         "任务"
     ]
@@ -329,7 +605,10 @@ if __name__ == "__main__":
     for t in tests:
         agent_id, msg, called_name = detect_agent(t, config)
         print(f"📩 {t}")
-        if agent_id:
+        targets = detect_agents(t, config)
+        if len(targets) > 1:
+            print(f"   -> 多个智能体: {targets}")
+        elif agent_id:
             info = get_agent_info(agent_id, config)
             main_name = info.get("names", [agent_id])[0]
             print(f"   -> 编号: {agent_id}, 主名: {main_name}, 任务: {msg}")
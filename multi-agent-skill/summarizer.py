@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+对话历史滚动摘要
+智能体空闲时（记忆文件一段时间没被写），把较早的对话交给本地模型，
+和已有摘要合并成一段新摘要存进记忆的 summary 字段，再把这些对话从 history 里移走。
+prompt 里放摘要 + 最近几轮，记忆文件不再无限变长，老的上下文也不会直接丢掉
+
+用法: python3 summarizer.py            # 处理一遍所有空闲智能体
+      python3 summarizer.py --loop     # 常驻，每隔一段时间检查一次
+"""
+
+import os
+import time
+from datetime import datetime
+
+from scheduler import load_config, load_memory, save_memory, get_memory_path, memory_lock
+
+FOLD_AT = 40            # history 超过这么多轮就做摘要（prompt 放不下全部历史时也做）
+KEEP_RECENT = 20        # 摘要后最多保留的轮数，prompt 放不下这么多时只保留放得下的
+IDLE_SECONDS = 120      # 记忆文件这么久没改过才算空闲
+SUMMARY_CHARS = 400     # 摘要长度上限
+CHECK_INTERVAL = 300    # --loop 时的检查间隔（秒）
+
+SUMMARY_PROMPT = """下面是你和用户较早的对话，以及之前的摘要。
+请把它们合并成一段不超过{limit}字的摘要，保留用户交代的事项、偏好、结论和未完成的事，不要编造。
+只输出摘要本身。
+
+## 之前的摘要
+{summary}
+
+## 较早的对话
+{dialog}"""
+
+def prompt_window(agent_id):
+    """prompt 里按模型预算放得下的最近轮数，和放不下的轮数（按不带任务的 prompt 估算）
+    放不下的那些既不在 prompt 里也不在摘要里，应当并入摘要
+    """
+    from scheduler import build_prompt_with_stats
+    stats = build_prompt_with_stats(agent_id, load_config())[1]
+    return stats["history_turns"], stats["dropped_turns"]
+
+def needs_summary(agent_id, now=None):
+    path = get_memory_path(agent_id)
+    if not path.exists():
+        return False
+    if (now or time.time()) - path.stat().st_mtime < IDLE_SECONDS:
+        return False
+    if len(load_memory(agent_id).get("history", [])) > FOLD_AT:
+        return True
+    return prompt_window(agent_id)[1] > 0
+
+def format_dialog(turns):
+    return "\n".join(
+        f"{'你' if h.get('role') == 'assistant' else '用户'}: {h.get('content', '')[:300]}" for h in turns
+    )
+
+def split_chunk(chunk, model):
+    """按模型预算把要并入的对话切成几段，每段连同提示词和上一版摘要都放得进 prompt"""
+    from context_budget import estimate_tokens, model_budget
+    from model_manager import DEFAULT_MODEL
+    fixed = estimate_tokens(SUMMARY_PROMPT.format(limit=SUMMARY_CHARS, summary="摘" * SUMMARY_CHARS, dialog=""))
+    room = max(64, model_budget(model or DEFAULT_MODEL) - fixed)
+    pieces, piece, used = [], [], 0
+    for turn in chunk:
+        cost = estimate_tokens(format_dialog([turn])) + 1
+        if piece and used + cost > room:
+            pieces.append(piece)
+            piece, used = [], 0
+        piece.append(turn)
+        used += cost
+    if piece:
+        pieces.append(piece)
+    return pieces
+
+def summarize_agent(agent_id, model=None):
+    """把 prompt 里放不下的、以及 KEEP_RECENT 轮之前的对话并入摘要，返回并入的轮数
+    对话多时分段，每段和上一段得到的摘要合并，单次 prompt 不超过模型预算
+    """
+    from kv_context import num_ctx
+    from model_manager import ollama_generate, DEFAULT_MODEL
+    mem = load_memory(agent_id)
+    history = mem.get("history", [])
+    shown, dropped = prompt_window(agent_id)
+    if len(history) <= FOLD_AT and not dropped:
+        return 0
+    keep = min(KEEP_RECENT, shown)
+    chunk = history[:len(history) - keep]
+    if not chunk:
+        return 0
+    old = mem.get("summary", {})
+
+    text = old.get("text") or ""
+    options = {"temperature": 0.2, "num_ctx": num_ctx(model or DEFAULT_MODEL)}
+    for piece in split_chunk(chunk, model):
+        prompt = SUMMARY_PROMPT.format(limit=SUMMARY_CHARS, summary=text or "（无）", dialog=format_dialog(piece))
+        result = ollama_generate(prompt, model=model, options=options)
+        text = (result.get("response") or "").strip()[:SUMMARY_CHARS]
+        if not text:
+            print(f"⚠️ {agent_id} 摘要失败: {result.get('error', '空回复')}")
+            return 0
+
+    # 生成期间可能又有新对话追加在末尾；加锁重新读一次，开头还是这些对话才按条数移走
+    with memory_lock(agent_id):
+        mem = load_memory(agent_id)
+        history = mem.get("history", [])
+        cut = len(chunk)
+        if history[:cut] != chunk:
+            print(f"⚠️ {agent_id} 摘要期间历史被改写，放弃这次摘要")
+            return 0
+        mem["history"] = history[cut:]
+        mem["summary"] = {
+            "text": text,
+            "turns": old.get("turns", 0) + cut,
+            "until": chunk[-1].get("timestamp"),
+            "updated_at": datetime.now().isoformat(),
+        }
+        save_memory(agent_id, mem)
+    return cut
+
+def summarize_idle_agents(model=None):
+    config = load_config()
+    now = time.time()
+    total = 0
+    for agent_id in config.get("agents", {}):
+        if needs_summary(agent_id, now):
+            folded = summarize_agent(agent_id, model)
+            if folded:
+                print(f"✅ {agent_id} 并入摘要 {folded} 轮")
+            total += folded
+    return total
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="对话历史滚动摘要")
+    parser.add_argument("--loop", action="store_true", help="常驻运行")
+    parser.add_argument("--model", default=os.environ.get("SUMMARY_MODEL"), help="摘要用的本地模型")
+    args = parser.parse_args()
+
+    if not args.loop:
+        summarize_idle_agents(args.model)
+    else:
+        while True:
+            try:
+                summarize_idle_agents(args.model)
+            except Exception as e:
+                print(f"摘要出错: {e}")
+            time.sleep(CHECK_INTERVAL)
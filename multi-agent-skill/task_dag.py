@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+任务的子任务依赖图（DAG）
+任务记录里的 subtasks: {子任务ID: {"agent_id", "content", "after": [依赖的子任务ID], "status", "output", ...}}
+没有依赖关系的子任务并发执行，上游的结果作为下游的输入，每完成一个就回调一次更新进度
+
+例: 小D写需求 -> 小C写代码，小B写文案
+    s1(小D) 完成后 s2(小C)、s3(小B) 同时开始
+"""
+
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+
+WAITING = "等待"
+RUNNING = "进行中"
+DONE = "已完成"
+FAILED = "失败"
+SKIPPED = "已跳过"
+
+MAX_WORKERS = 4
+
+def normalize_subtasks(subtasks):
+    """列表或字典 -> {ID: 子任务}，补全默认字段并检查依赖（不存在的依赖、环）"""
+    if isinstance(subtasks, list):
+        subtasks = {st.get("id") or f"s{i + 1}": st for i, st in enumerate(subtasks)}
+    nodes = {}
+    for node_id, st in subtasks.items():
+        if not st.get("agent_id") or not st.get("content"):
+            raise ValueError(f"子任务 {node_id} 缺少 agent_id 或 content")
+        nodes[node_id] = {
+            "agent_id": st["agent_id"],
+            "content": st["content"],
+            "after": list(st.get("after", [])),
+            "status": st.get("status", WAITING),
+            "output": st.get("output", ""),
+        }
+    for node_id, node in nodes.items():
+        for dep in node["after"]:
+            if dep not in nodes:
+                raise ValueError(f"子任务 {node_id} 依赖的 {dep} 不存在")
+
+    # 拓扑排序检查环
+    indegree = {nid: len(n["after"]) for nid, n in nodes.items()}
+    queue = [nid for nid, d in indegree.items() if d == 0]
+    for nid in queue:
+        for other, n in nodes.items():
+            if nid in n["after"]:
+                indegree[other] -= 1
+                if indegree[other] == 0:
+                    queue.append(other)
+    if len(queue) != len(nodes):
+        raise ValueError("子任务依赖有环")
+    return nodes
+
+def parse_pipeline(text, config):
+    """「小D写需求 -> 小C写代码，小B写文案」-> 子任务列表
+    用 -> / → 分阶段，阶段内点名的智能体并行，每个阶段依赖上一阶段的全部子任务
+    """
+    from scheduler import detect_agents
+    subtasks = []
+    previous = []
+    for stage in re.split(r"\s*(?:->|→|=>)\s*", text.strip()):
+        current = []
+        for agent_id, task, _ in detect_agents(stage, config):
+            node_id = f"s{len(subtasks) + 1}"
+            subtasks.append({"id": node_id, "agent_id": agent_id, "content": task or stage, "after": list(previous)})
+            current.append(node_id)
+        if current:
+            previous = current
+    return subtasks
+
+def progress(nodes):
+    finished = sum(1 for n in nodes.values() if n["status"] in (DONE, FAILED, SKIPPED))
+    return finished, len(nodes)
+
+def run_dag(nodes, run_node, on_change=None, max_workers=MAX_WORKERS):
+    """执行 DAG，返回整体状态（DONE / FAILED）
+    run_node(子任务ID, 子任务, {上游ID: 上游子任务}) -> 输出文本，出错时抛异常
+    on_change(子任务ID, 子任务, 已结束数, 总数) 在状态变化时调用（持久化、汇报进度）
+    已完成的子任务（中断后重跑）直接复用输出
+    """
+    lock = threading.Lock()
+
+    def changed(node_id):
+        if on_change:
+            done, total = progress(nodes)
+            on_change(node_id, nodes[node_id], done, total)
+
+    for node in nodes.values():
+        if node["status"] == RUNNING:
+            node["status"] = WAITING
+
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while True:
+            with lock:
+                # 上游失败/跳过的，下游跳过
+                skipped = True
+                while skipped:
+                    skipped = False
+                    for node_id, node in nodes.items():
+                        if node["status"] == WAITING and any(nodes[d]["status"] in (FAILED, SKIPPED) for d in node["after"]):
+                            node["status"] = SKIPPED
+                            skipped = True
+                            changed(node_id)
+                for node_id, node in nodes.items():
+                    if node["status"] != WAITING or not all(nodes[d]["status"] == DONE for d in node["after"]):
+                        continue
+                    node["status"] = RUNNING
+                    node["started_at"] = datetime.now().isoformat()
+                    changed(node_id)
+                    upstream = {d: nodes[d] for d in node["after"]}
+                    running[pool.submit(run_node, node_id, node, upstream)] = node_id
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            with lock:
+                for future in finished:
+                    node_id = running.pop(future)
+                    node = nodes[node_id]
+                    try:
+                        node["output"] = future.result()
+                        node["status"] = DONE
+                    except Exception as e:
+                        node["output"] = f"出错: {e}"
+                        node["status"] = FAILED
+                    node["finished_at"] = datetime.now().isoformat()
+                    changed(node_id)
+
+    return DONE if all(n["status"] == DONE for n in nodes.values()) else FAILED
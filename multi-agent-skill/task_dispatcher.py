@@ -37,8 +37,10 @@ def update_task_status(task_id, status, progress, note=""):
             tasks[task_id]["note"] = note
         from datetime import datetime
         tasks[task_id]["updated_at"] = datetime.now().isoformat()
-        with open(tasks_file, "w", encoding="utf-8") as f:
+        with open(SKILL_DIR / "tasks.json", "w", encoding="utf-8") as f:
             json.dump(tasks, f, ensure_ascii=False, indent=2)
+        from agent_meta import tasks_saved
+        tasks_saved(tasks)
 
 def run_task_background(task_id, task_content):
     """后台执行任务"""
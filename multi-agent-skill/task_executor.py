@@ -30,18 +30,27 @@ def load_tasks():
 def save_tasks(tasks):
     with open(TASKS_FILE, "w", encoding="utf-8") as f:
         json.dump(tasks, f, ensure_ascii=False, indent=2)
-
-def update_task(task_id, status=None, progress=None, note=None):
-    tasks = load_tasks()
-    if task_id in tasks:
-        if status:
-            tasks[task_id]["status"] = status
-        if progress:
-            tasks[task_id]["progress"] = progress
-        if note:
-            tasks[task_id]["note"] = note
-        tasks[task_id]["updated_at"] = datetime.now().isoformat()
-        save_tasks(tasks)
+    from agent_meta import tasks_saved
+    tasks_saved(tasks)
+
+# 同一个任务的多个子任务线程会同时改 tasks.json
+TASKS_LOCK = threading.Lock()
+
+def update_task(task_id, status=None, progress=None, note=None, subtask=None):
+    """subtask: (子任务ID, 子任务) 时一并写入该子任务的状态和输出"""
+    with TASKS_LOCK:
+        tasks = load_tasks()
+        if task_id in tasks:
+            if status:
+                tasks[task_id]["status"] = status
+            if progress:
+                tasks[task_id]["progress"] = progress
+            if note:
+                tasks[task_id]["note"] = note
+            if subtask:
+                tasks[task_id].setdefault("subtasks", {})[subtask[0]] = dict(subtask[1])
+            tasks[task_id]["updated_at"] = datetime.now().isoformat()
+            save_tasks(tasks)
 
 # 任务执行器
 def execute_task(task_id, task_content, agent_id):
@@ -74,6 +83,53 @@ def execute_task(task_id, task_content, agent_id):
     send_qq(msg)
     print(f"任务完成: {task_id}")
 
+def execute_dag_task(task_id, task):
+    """按子任务依赖图执行：互不依赖的子任务并发，上游输出拼进下游的任务内容，
+    每个子任务结束就更新整体进度。出错（子任务定义有误、写任务文件失败等）时任务标记为失败，
+    不会一直停在进行中"""
+    try:
+        run_dag_task(task_id, task)
+    except Exception as e:
+        print(f"流程任务出错: {task_id} {e}")
+        try:
+            update_task(task_id, status="失败", note=f"执行出错: {str(e)[:80]}")
+        except Exception as e2:
+            print(f"更新任务状态失败: {task_id} {e2}")
+        send_qq(f"❌ 主人，任务执行出错了～\n\n任务：{task.get('content', '')}\n原因：{str(e)[:100]}")
+
+def run_dag_task(task_id, task):
+    from scheduler import load_config, run_agent, get_agent_display_name
+    from task_dag import normalize_subtasks, run_dag, DONE
+    print(f"开始执行流程任务: {task_id} - {task.get('content', '')}")
+    config = load_config()
+    nodes = normalize_subtasks(task["subtasks"])
+
+    def run_node(node_id, node, upstream):
+        content = node["content"]
+        if upstream:
+            parts = [f"【{get_agent_display_name(u['agent_id'], config)}】\n{u['output']}" for u in upstream.values()]
+            content += "\n\n## 上游结果\n" + "\n\n".join(parts)
+        return run_agent(node["agent_id"], content, config, strict=True)
+
+    def on_change(node_id, node, done, total):
+        name = get_agent_display_name(node["agent_id"], config)
+        update_task(task_id, progress=f"{done * 100 // total}%", note=f"{name}{node['status']}: {node['content'][:50]}",
+                    subtask=(node_id, node))
+
+    status = run_dag(nodes, run_node, on_change)
+    lines = [f"{'✅' if n['status'] == DONE else '❌'} {get_agent_display_name(n['agent_id'], config)}（{n['status']}）：{n['output'][:80]}"
+             for n in nodes.values()]
+    update_task(task_id, status="已完成" if status == DONE else "失败", progress="100%")
+
+    msg = f"""{'✅ 主人，任务已完成啦～喵喵喵！' if status == DONE else '❌ 主人，任务有部分没完成～'}
+
+任务：{task.get('content', '')}
+""" + "\n".join(lines) + """
+
+～喵喵喵～ 任务汇报完毕！"""
+    send_qq(msg)
+    print(f"流程任务结束: {task_id} {status}")
+
 def execute_beauty_task(task_content):
     """美妆趋势任务"""
     try:
@@ -135,10 +191,13 @@ def run_executor():
                     if (now - created).total_seconds() > 5:
                         checked_tasks.add(task_id)
                         # 在后台执行任务
-                        thread = threading.Thread(
-                            target=execute_task,
-                            args=(task_id, task.get("content", ""), task.get("agent_id", ""))
-                        )
+                        if task.get("subtasks"):
+                            thread = threading.Thread(target=execute_dag_task, args=(task_id, task))
+                        else:
+                            thread = threading.Thread(
+                                target=execute_task,
+                                args=(task_id, task.get("content", ""), task.get("agent_id", ""))
+                            )
                         thread.daemon = True
                         thread.start()
                         print(f"触发任务执行: {task_id}")
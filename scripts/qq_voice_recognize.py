@@ -1,73 +1,94 @@
 #!/usr/bin/env python3
 """
-QQ 语音识别 - SILK -> WAV -> Whisper
+QQ 语音识别 - SILK -> PCM(内存) -> Whisper
+解码结果通过管道读入内存，重采样到 16kHz 后直接送入模型，不落临时文件
 """
 
 import os
 import sys
 import subprocess
 
+import numpy as np
+
+from whisper_server import request_transcribe, create_model, STT_CONFIG
+
 # 设置 HuggingFace 镜像
 os.environ['HF_ENDPOINT'] = 'https://hf-mirror.com'
 
 SILK_DECODER = '/home/admin/silk-v3-decoder/silk/decoder'
+SILK_SAMPLE_RATE = 24000
+WHISPER_SAMPLE_RATE = 16000
 MODEL = None
 
 def load_model():
     global MODEL
     if MODEL is None:
         print("Loading whisper model...", file=sys.stderr)
-        from faster_whisper import WhisperModel
-        MODEL = WhisperModel('tiny', device='cpu', compute_type='int8')
+        MODEL = create_model()
         print("Model loaded!", file=sys.stderr)
     return MODEL
 
-def silk_to_wav(silk_path, wav_path):
-    """转换 SILK 到 WAV"""
-    pcm_path = wav_path.replace('.wav', '.pcm')
-    
-    # 1. SILK -> PCM
-    result = subprocess.run(
-        [SILK_DECODER, silk_path, pcm_path],
-        capture_output=True, text=True
-    )
-    if result.returncode != 0:
-        return False, f"Decoder error: {result.stderr}"
-    
-    # 2. PCM -> WAV
-    result = subprocess.run(
-        ['ffmpeg', '-f', 's16le', '-ar', '24000', '-ac', '1', '-i', pcm_path, wav_path, '-y'],
-        capture_output=True, text=True
-    )
-    
-    # 清理 PCM
-    if os.path.exists(pcm_path):
-        os.remove(pcm_path)
-    
-    return result.returncode == 0, "OK"
-
-def transcribe(wav_path):
-    """识别 WAV 文件"""
+def decode_silk(silk_path):
+    """SILK -> 16bit PCM 字节（解码器输出写入管道，不落盘）"""
+    read_fd, write_fd = os.pipe()
+    try:
+        proc = subprocess.Popen(
+            [SILK_DECODER, silk_path, f'/dev/fd/{write_fd}', '-Fs_API', str(SILK_SAMPLE_RATE)],
+            pass_fds=(write_fd,), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+    except OSError as e:
+        os.close(read_fd)
+        os.close(write_fd)
+        return False, f"Decoder error: {e}"
+    os.close(write_fd)
+
+    with os.fdopen(read_fd, 'rb') as pipe:
+        pcm = pipe.read()
+    stderr = proc.stderr.read().decode(errors='replace')
+    proc.wait()
+
+    if proc.returncode != 0 or not pcm:
+        return False, f"Decoder error: {stderr}"
+    return True, pcm
+
+def pcm_to_float32(pcm, sample_rate=SILK_SAMPLE_RATE):
+    """16bit PCM -> float32 [-1, 1]，并线性重采样到 16kHz"""
+    audio = np.frombuffer(pcm[:len(pcm) // 2 * 2], dtype='<i2').astype(np.float32) / 32768.0
+    if sample_rate == WHISPER_SAMPLE_RATE or len(audio) == 0:
+        return audio
+
+    duration = len(audio) / sample_rate
+    target_len = int(duration * WHISPER_SAMPLE_RATE)
+    src_t = np.arange(len(audio), dtype=np.float64) / sample_rate
+    dst_t = np.arange(target_len, dtype=np.float64) / WHISPER_SAMPLE_RATE
+    return np.interp(dst_t, src_t, audio).astype(np.float32)
+
+def transcribe(audio):
+    """识别音频（文件路径或 16kHz float32 数组）"""
+    # 优先交给常驻服务（模型已加载），服务未启动时本进程加载模型
+    if isinstance(audio, np.ndarray):
+        result = request_transcribe(audio_array=audio)
+    else:
+        result = request_transcribe(audio)
+    if result and result.get("success"):
+        return result["text"]
+
     model = load_model()
-    segments, info = model.transcribe(wav_path, language='zh')
+    segments, info = model.transcribe(audio, language='zh', beam_size=STT_CONFIG['beam_size'])
     return ''.join([s.text for s in segments])
 
 def recognize_silk(silk_path):
     """识别 SILK 文件"""
-    wav_path = '/tmp/silk_recognized.wav'
-    
-    # 转换
-    ok, msg = silk_to_wav(silk_path, wav_path)
+    ok, pcm = decode_silk(silk_path)
     if not ok:
-        return f"转换失败: {msg}"
-    
-    # 识别
-    return transcribe(wav_path)
+        return f"转换失败: {pcm}"
+
+    return transcribe(pcm_to_float32(pcm))
 
 if __name__ == '__main__':
     if len(sys.argv) < 2:
         print("Usage: python3 qq_voice_recognize.py <silk_file>")
         sys.exit(1)
-    
+
     result = recognize_silk(sys.argv[1])
     print(result)
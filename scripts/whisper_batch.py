@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+批量语音识别 - 一次处理整个目录的语音消息
+多进程并行解码音频，主进程用同一个已加载的模型依次识别，结果逐行写入 JSONL
+已识别过的文件（按内容哈希）自动跳过
+
+用法: python3 whisper_batch.py <目录或文件...> [-o results.jsonl] [-j 进程数]
+      python3 whisper_batch.py @file_list.txt
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from whisper_server import load_model, STT_CONFIG
+from qq_voice_recognize import decode_silk, pcm_to_float32
+
+AUDIO_EXTS = {'.silk', '.amr', '.slk', '.wav', '.mp3', '.m4a', '.ogg', '.flac'}
+DEFAULT_OUTPUT = 'voice_transcripts.jsonl'
+
+def collect_files(inputs):
+    """展开目录 / 文件 / @列表文件"""
+    files = []
+    for item in inputs:
+        if item.startswith('@'):
+            with open(item[1:], 'r', encoding='utf-8') as f:
+                files.extend(Path(line.strip()) for line in f if line.strip())
+            continue
+        path = Path(item)
+        if path.is_dir():
+            files.extend(sorted(p for p in path.rglob('*') if p.suffix.lower() in AUDIO_EXTS))
+        else:
+            files.append(path)
+    return files
+
+def file_hash(path):
+    """文件内容 SHA256"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def load_done_hashes(output_path):
+    """读取已有结果中识别成功的哈希"""
+    done = set()
+    if os.path.exists(output_path):
+        with open(output_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get('success'):
+                    done.add(record.get('sha256'))
+    return done
+
+def decode_file(path):
+    """解码为 16kHz float32（在子进程中执行）"""
+    start = time.time()
+    with open(path, 'rb') as f:
+        header = f.read(10)
+
+    if b'SILK' in header:
+        ok, pcm = decode_silk(str(path))
+        if not ok:
+            return None, pcm, time.time() - start
+        audio = pcm_to_float32(pcm)
+    else:
+        result = subprocess.run(
+            ['ffmpeg', '-nostdin', '-i', str(path), '-f', 'f32le', '-ac', '1', '-ar', '16000', '-'],
+            capture_output=True
+        )
+        if result.returncode != 0:
+            return None, f"ffmpeg error: {result.stderr.decode(errors='replace')[-200:]}", time.time() - start
+        audio = np.frombuffer(result.stdout, dtype=np.float32)
+    return audio, "OK", time.time() - start
+
+def run_batch(inputs, output_path=DEFAULT_OUTPUT, workers=None):
+    """批量识别，返回 (识别数, 跳过数, 失败数)"""
+    files = collect_files(inputs)
+    done = load_done_hashes(output_path)
+
+    pending = []
+    skipped = 0
+    for path in files:
+        if not path.exists():
+            continue
+        digest = file_hash(path)
+        if digest in done:
+            skipped += 1
+            continue
+        done.add(digest)  # 同一批里重复的文件只识别一次
+        pending.append((path, digest))
+
+    print(f"共 {len(files)} 个文件，跳过 {skipped} 个，待识别 {len(pending)} 个", file=sys.stderr)
+    if not pending:
+        return 0, skipped, 0
+
+    model = load_model()
+    ok_count = failed = 0
+    workers = workers or os.cpu_count() or 2
+
+    with ProcessPoolExecutor(max_workers=workers) as pool, open(output_path, 'a', encoding='utf-8') as out:
+        # 解码提前排队，但只保留有限个结果在内存里
+        window = workers * 2
+        futures = [pool.submit(decode_file, path) for path, _ in pending[:window]]
+        for i, (path, digest) in enumerate(pending):
+            audio, msg, decode_time = futures[i].result()
+            futures[i] = None
+            if i + window < len(pending):
+                futures.append(pool.submit(decode_file, pending[i + window][0]))
+
+            record = {"file": str(path), "sha256": digest, "timing": {"decode": round(decode_time, 3)}}
+            if audio is None:
+                record.update({"success": False, "error": msg})
+                failed += 1
+            else:
+                start = time.time()
+                segments, info = model.transcribe(audio, language='zh', beam_size=STT_CONFIG['beam_size'])
+                record.update({
+                    "success": True,
+                    "text": ''.join([s.text for s in segments]),
+                    "duration": round(info.duration, 2),
+                })
+                record["timing"]["transcribe"] = round(time.time() - start, 3)
+                ok_count += 1
+
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+            out.flush()
+            print(f"[{i + 1}/{len(pending)}] {path.name}: {record.get('text', record.get('error'))}", file=sys.stderr)
+
+    return ok_count, skipped, failed
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="批量语音识别")
+    parser.add_argument("inputs", nargs="+", help="目录、文件或 @文件列表")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT, help="结果 JSONL 文件")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="解码进程数")
+    args = parser.parse_args()
+
+    ok_count, skipped, failed = run_batch(args.inputs, args.output, args.jobs)
+    print(f"✅ 完成：识别 {ok_count}，跳过 {skipped}，失败 {failed}")
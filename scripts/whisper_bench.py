@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+语音识别基准测试 - 选择模型大小和计算类型
+用固定的中文语料跑不同的 模型 / 计算类型 / beam / 线程数 组合，
+统计实时率(RTF)、峰值内存、加载时间、字错率(CER)，并把推荐配置写入 whisper_config.json
+
+语料目录: 每个音频文件旁放同名 .txt 参考文本，如 001.wav + 001.txt
+用法: python3 whisper_bench.py [语料目录] --models tiny,base --compute int8,float32 --beams 1,5 --threads 2,4
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+import multiprocessing
+from pathlib import Path
+from datetime import datetime
+
+from whisper_server import CONFIG_FILE
+
+BENCH_CORPUS = Path(__file__).parent / 'bench_corpus'
+AUDIO_EXTS = {'.wav', '.mp3', '.m4a', '.ogg', '.flac'}
+CER_TOLERANCE = 0.02    # 推荐配置允许比最低字错率高出的幅度
+PUNCTUATION = set(" \t\n，。！？、；：,.!?;:\"'“”‘’（）()《》…-")
+
+def load_corpus(corpus_dir):
+    """读取语料：[(音频路径, 参考文本), ...]"""
+    corpus = []
+    for audio in sorted(Path(corpus_dir).iterdir()):
+        ref = audio.with_suffix('.txt')
+        if audio.suffix.lower() in AUDIO_EXTS and ref.exists():
+            corpus.append((str(audio), ref.read_text(encoding='utf-8').strip()))
+    return corpus
+
+def normalize(text):
+    return ''.join(c for c in text if c not in PUNCTUATION)
+
+def edit_distance(a, b):
+    """字符级编辑距离"""
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+def run_config(config, corpus, queue):
+    """在独立子进程中测一组配置（峰值内存互不干扰）"""
+    import resource
+    from faster_whisper import WhisperModel, decode_audio
+
+    start = time.time()
+    model = WhisperModel(config['model_size'], device='cpu', compute_type=config['compute_type'],
+                         cpu_threads=config['cpu_threads'])
+    load_time = time.time() - start
+
+    audio_seconds = transcribe_seconds = 0.0
+    errors = ref_chars = 0
+    for audio_path, reference in corpus:
+        audio = decode_audio(audio_path, sampling_rate=16000)
+        audio_seconds += len(audio) / 16000
+        start = time.time()
+        segments, info = model.transcribe(audio, language='zh', beam_size=config['beam_size'])
+        hypothesis = ''.join([s.text for s in segments])
+        transcribe_seconds += time.time() - start
+
+        ref = normalize(reference)
+        errors += edit_distance(ref, normalize(hypothesis))
+        ref_chars += len(ref)
+
+    queue.put({
+        **config,
+        "load_time": round(load_time, 2),
+        "rtf": round(transcribe_seconds / audio_seconds, 3) if audio_seconds else None,
+        "cer": round(errors / ref_chars, 4) if ref_chars else None,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    })
+
+def benchmark(corpus, models, compute_types, beams, threads):
+    """依次测所有组合"""
+    ctx = multiprocessing.get_context('spawn')
+    results = []
+    for model_size, compute_type, beam_size, cpu_threads in itertools.product(models, compute_types, beams, threads):
+        config = {"model_size": model_size, "compute_type": compute_type,
+                  "beam_size": beam_size, "cpu_threads": cpu_threads}
+        queue = ctx.Queue()
+        proc = ctx.Process(target=run_config, args=(config, corpus, queue))
+        proc.start()
+        proc.join()
+        if proc.exitcode != 0 or queue.empty():
+            print(f"❌ {config} 运行失败", file=sys.stderr)
+            continue
+        result = queue.get()
+        results.append(result)
+        print(f"{model_size:>8} {compute_type:>8} beam={beam_size} threads={cpu_threads} | "
+              f"RTF {result['rtf']} | CER {result['cer']} | 加载 {result['load_time']}s | "
+              f"内存 {result['peak_rss_mb']}MB")
+    return results
+
+def recommend(results):
+    """实时率 < 1 且字错率接近最优的组合里选最快的"""
+    valid = [r for r in results if r['rtf'] is not None and r['cer'] is not None]
+    if not valid:
+        return None
+    best_cer = min(r['cer'] for r in valid)
+    candidates = [r for r in valid if r['cer'] <= best_cer + CER_TOLERANCE and r['rtf'] < 1] or valid
+    return min(candidates, key=lambda r: (r['rtf'], r['peak_rss_mb']))
+
+def save_recommendation(best, results):
+    data = {
+        "model_size": best['model_size'],
+        "compute_type": best['compute_type'],
+        "beam_size": best['beam_size'],
+        "cpu_threads": best['cpu_threads'],
+        "benchmark": {"selected": best, "results": results},
+        "updated_at": datetime.now().isoformat(),
+    }
+    with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+def split_list(value, cast=str):
+    return [cast(v) for v in value.split(',') if v]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="语音识别基准测试")
+    parser.add_argument("corpus", nargs="?", default=str(BENCH_CORPUS), help="语料目录")
+    parser.add_argument("--models", default="tiny,base,small")
+    parser.add_argument("--compute", default="int8,int8_float32,float32")
+    parser.add_argument("--beams", default="1,5")
+    parser.add_argument("--threads", default=str(os.cpu_count() or 4))
+    parser.add_argument("--dry-run", action="store_true", help="只输出结果，不写入配置")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        print(f"语料目录为空或缺少参考文本: {args.corpus}", file=sys.stderr)
+        sys.exit(1)
+    print(f"语料 {len(corpus)} 条", file=sys.stderr)
+
+    results = benchmark(corpus, split_list(args.models), split_list(args.compute),
+                        split_list(args.beams, int), split_list(args.threads, int))
+    best = recommend(results)
+    if not best:
+        print("没有可用的测试结果", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"\n✅ 推荐配置: {best['model_size']} / {best['compute_type']} / beam={best['beam_size']} / "
+          f"threads={best['cpu_threads']} (RTF {best['rtf']}, CER {best['cer']})")
+    if not args.dry_run:
+        save_recommendation(best, results)
+        print(f"已写入 {CONFIG_FILE}")
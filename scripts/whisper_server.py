@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Whisper 常驻识别服务 - 模型只加载一次
+通过 Unix Socket 接收识别请求（音频路径或音频字节），排队识别后返回文字和耗时
+
+启动: python3 whisper_server.py [socket路径]
+协议: 每个连接发送一行 JSON，返回一行 JSON
+  请求: {"path": "/tmp/a.wav"}、{"audio": "<base64音频文件>"} 或 {"pcm": "<base64 16kHz float32>"}，可选 "language"
+  返回: {"success": true, "text": "...", "timing": {"queue": 0.01, "transcribe": 1.2, "model_load": 3.4}}
+"""
+
+import os
+import sys
+import io
+import json
+import time
+import base64
+import queue
+import socket
+import threading
+import socketserver
+from pathlib import Path
+
+# 设置 HuggingFace 镜像
+os.environ['HF_ENDPOINT'] = 'https://hf-mirror.com'
+
+SOCKET_PATH = os.environ.get('WHISPER_SOCKET', '/tmp/whisper_stt.sock')
+
+# 模型配置，由 whisper_bench.py 根据基准测试结果写入
+CONFIG_FILE = Path(__file__).parent / 'whisper_config.json'
+DEFAULT_STT_CONFIG = {
+    "model_size": "tiny",
+    "compute_type": "int8",
+    "beam_size": 5,
+    "cpu_threads": 0,   # 0 表示自动
+}
+
+def load_stt_config():
+    """读取识别配置，缺失的字段用默认值"""
+    config = DEFAULT_STT_CONFIG.copy()
+    if CONFIG_FILE.exists():
+        try:
+            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            config.update({k: saved[k] for k in DEFAULT_STT_CONFIG if k in saved})
+        except ValueError:
+            pass
+    return config
+
+STT_CONFIG = load_stt_config()
+
+def create_model(cpu_threads=None):
+    """按配置创建模型"""
+    from faster_whisper import WhisperModel
+    return WhisperModel(
+        STT_CONFIG['model_size'], device='cpu', compute_type=STT_CONFIG['compute_type'],
+        cpu_threads=cpu_threads or STT_CONFIG['cpu_threads']
+    )
+
+MODEL = None
+MODEL_LOAD_TIME = 0.0
+
+# 识别请求队列，由单个工作线程串行处理（模型不是线程安全的）
+JOBS = queue.Queue()
+
+def load_model():
+    global MODEL, MODEL_LOAD_TIME
+    if MODEL is None:
+        print("Loading whisper model...", file=sys.stderr)
+        start = time.time()
+        MODEL = create_model()
+        MODEL_LOAD_TIME = time.time() - start
+        print(f"Model loaded! ({MODEL_LOAD_TIME:.2f}s)", file=sys.stderr)
+    return MODEL
+
+def run_job(req):
+    """执行一次识别"""
+    model = load_model()
+    if req.get('path'):
+        audio = req['path']
+        if not os.path.exists(audio):
+            return {"success": False, "error": f"File not found: {audio}"}
+    elif req.get('audio'):
+        audio = io.BytesIO(base64.b64decode(req['audio']))
+    elif req.get('pcm'):
+        import numpy as np
+        audio = np.frombuffer(base64.b64decode(req['pcm']), dtype=np.float32)
+    else:
+        return {"success": False, "error": "请求缺少 path、audio 或 pcm"}
+
+    start = time.time()
+    segments, info = model.transcribe(audio, language=req.get('language', 'zh'), beam_size=STT_CONFIG['beam_size'])
+    text = ''.join([s.text for s in segments])
+    return {
+        "success": True,
+        "text": text,
+        "duration": round(info.duration, 2),
+        "timing": {"transcribe": round(time.time() - start, 3)},
+    }
+
+def worker():
+    """识别工作线程"""
+    while True:
+        job = JOBS.get()
+        job['timing_queue'] = time.time() - job['queued_at']
+        try:
+            result = run_job(job['request'])
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+        result.setdefault("timing", {})
+        result["timing"]["queue"] = round(job['timing_queue'], 3)
+        result["timing"]["model_load"] = round(MODEL_LOAD_TIME, 3)
+        job['result'] = result
+        job['done'].set()
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            req = json.loads(line)
+        except ValueError:
+            result = {"success": False, "error": "请求不是合法 JSON"}
+        else:
+            job = {"request": req, "queued_at": time.time(), "done": threading.Event()}
+            JOBS.put(job)
+            job['done'].wait()
+            result = job['result']
+        self.wfile.write((json.dumps(result, ensure_ascii=False) + '\n').encode())
+
+class WhisperServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def serve(socket_path=SOCKET_PATH):
+    """启动服务（阻塞）"""
+    load_model()
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    threading.Thread(target=worker, daemon=True).start()
+    server = WhisperServer(socket_path, RequestHandler)
+    print(f"🎙️ Whisper 服务已启动: {socket_path}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+# ========== 客户端 ==========
+
+def request_transcribe(audio_path=None, audio_bytes=None, audio_array=None, language='zh',
+                       socket_path=SOCKET_PATH, timeout=300):
+    """向常驻服务发送识别请求，服务未启动时返回 None
+    audio_array 为 16kHz 单声道 float32 数组（numpy）
+    """
+    if not os.path.exists(socket_path):
+        return None
+    req = {"language": language}
+    if audio_path:
+        req["path"] = os.path.abspath(audio_path)
+    elif audio_array is not None:
+        req["pcm"] = base64.b64encode(audio_array.astype('float32').tobytes()).decode()
+    else:
+        req["audio"] = base64.b64encode(audio_bytes).decode()
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(socket_path)
+            sock.sendall((json.dumps(req) + '\n').encode())
+            data = b''
+            while not data.endswith(b'\n'):
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                data += chunk
+        return json.loads(data)
+    except (OSError, ValueError):
+        return None
+
+if __name__ == '__main__':
+    serve(sys.argv[1] if len(sys.argv) > 1 else SOCKET_PATH)
@@ -2,26 +2,31 @@
 """
 语音识别工具 - 使用 Faster Whisper
 支持格式: WAV, MP3, FLAC, M4A, OGG (需要先转换)
+长录音（会议记录、家长会等）用 --long：按静音切段，多进程并行识别后按时间拼接
 """
 
 import sys
 import os
 import subprocess
+from concurrent.futures import ProcessPoolExecutor
 
 # 设置 HuggingFace 镜像
 os.environ['HF_ENDPOINT'] = 'https://hf-mirror.com'
 
 sys.path.insert(0, '/home/admin/.local/lib/python3.10/site-packages')
 
-from faster_whisper import WhisperModel
+from whisper_server import request_transcribe, create_model, STT_CONFIG
 
 MODEL = None
 
+SAMPLE_RATE = 16000
+CHUNK_SECONDS = 30      # 每段最长时长（Whisper 窗口大小）
+
 def load_model():
     global MODEL
     if MODEL is None:
         print("Loading whisper model...", file=sys.stderr)
-        MODEL = WhisperModel('tiny', device='cpu', compute_type='int8')
+        MODEL = create_model()
         print("Model loaded!", file=sys.stderr)
     return MODEL
 
@@ -45,7 +50,7 @@ def convert_silk_to_wav(silk_path, wav_path):
 def transcribe(audio_path):
     """识别音频文件"""
     # 检查文件类型
-    ext = os.path.s.path.splitext(audio_path)[1].lower()
+    ext = os.path.splitext(audio_path)[1].lower()
     
     # 如果是 SILK 格式，尝试转换
     if ext in ['.silk', '.amr'] and b'SILK' in open(audio_path, 'rb').read(20):
@@ -56,8 +61,13 @@ def transcribe(audio_path):
         else:
             return "[错误: SILK 格式需要解码器，当前无法处理]"
     
+    # 优先交给常驻服务（模型已加载），服务未启动时本进程加载模型
+    result = request_transcribe(audio_path)
+    if result and result.get("success"):
+        return result["text"]
+    
     model = load_model()
-    segments, info = model.transcribe(audio_path, language='zh')
+    segments, info = model.transcribe(audio_path, language='zh', beam_size=STT_CONFIG['beam_size'])
     
     result = []
     for segment in segments:
@@ -65,15 +75,88 @@ def transcribe(audio_path):
     
     return ''.join(result)
 
+# ========== 长录音并行识别 ==========
+
+def split_on_silence(audio, max_seconds=CHUNK_SECONDS):
+    """用 VAD 找出语音区间，在静音处切成不超过 max_seconds 的段
+    返回 [(起始采样点, 结束采样点), ...]
+    """
+    from faster_whisper.vad import VadOptions, get_speech_timestamps
+    speech = get_speech_timestamps(audio, VadOptions(min_silence_duration_ms=500))
+    max_samples = max_seconds * SAMPLE_RATE
+
+    chunks = []
+    for ts in speech:
+        start, end = ts['start'], ts['end']
+        # 单个语音区间过长时硬切
+        while end - start > max_samples:
+            chunks.append([start, start + max_samples])
+            start += max_samples
+        if chunks and end - chunks[-1][0] <= max_samples:
+            chunks[-1][1] = end
+        else:
+            chunks.append([start, end])
+    return [tuple(c) for c in chunks]
+
+def _init_worker(cpu_threads):
+    """子进程初始化：每个进程加载自己的模型（默认 int8）"""
+    global MODEL
+    MODEL = create_model(cpu_threads)
+
+def _transcribe_chunk(args):
+    """识别一段，时间戳换算回整段录音"""
+    index, offset, audio = args
+    segments, info = MODEL.transcribe(audio, language='zh', beam_size=STT_CONFIG['beam_size'], vad_filter=False)
+    base = offset / SAMPLE_RATE
+    return index, [(base + s.start, base + s.end, s.text) for s in segments]
+
+def transcribe_long(audio_path, workers=None):
+    """长录音识别，返回按时间排序的 [(开始秒, 结束秒, 文字), ...]"""
+    from faster_whisper import decode_audio
+    audio = decode_audio(audio_path, sampling_rate=SAMPLE_RATE)
+    chunks = split_on_silence(audio)
+    if not chunks:
+        return []
+
+    cores = os.cpu_count() or 1
+    workers = min(workers or cores, len(chunks))
+    cpu_threads = max(1, cores // workers)
+    print(f"共 {len(chunks)} 段，{workers} 个进程并行识别...", file=sys.stderr)
+
+    jobs = [(i, start, audio[start:end]) for i, (start, end) in enumerate(chunks)]
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cpu_threads,)) as pool:
+        for index, segments in pool.map(_transcribe_chunk, jobs):
+            results[index] = segments
+
+    return [seg for i in range(len(chunks)) for seg in results[i]]
+
+def format_timestamp(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
 if __name__ == '__main__':
-    if len(sys.argv) < 2:
-        print("Usage: python3 whisper_stt.py <audio_file>", file=sys.stderr)
-        sys.exit(1)
+    import argparse
+    parser = argparse.ArgumentParser(description="语音识别")
+    parser.add_argument("audio_file")
+    parser.add_argument("--long", action="store_true", help="长录音模式（按静音切段并行识别）")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="长录音模式的进程数")
+    parser.add_argument("--timestamps", action="store_true", help="长录音模式下输出时间戳")
+    args = parser.parse_args()
     
-    audio_file = sys.argv[1]
+    audio_file = args.audio_file
     if not os.path.exists(audio_file):
         print(f"File not found: {audio_file}", file=sys.stderr)
         sys.exit(1)
     
-    text = transcribe(audio_file)
-    print(text)
+    if args.long:
+        segments = transcribe_long(audio_file, args.jobs)
+        if args.timestamps:
+            for start, end, text in segments:
+                print(f"[{format_timestamp(start)} - {format_timestamp(end)}] {text.strip()}")
+        else:
+            print(''.join(text for _, _, text in segments))
+    else:
+        text = transcribe(audio_file)
+        print(text)